@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+
+"""Compare reading shapefile attributes through pyshp and with load_dbf
+
+Writes a synthetic shapefile with a wide attribute table, mixing numeric,
+logical, date and text fields, then times reading every record's
+properties, first with pyshp's iterRecords and then with load_dbf.
+
+usage: python benchmarks/dbf_records.py [--features N] [--fields N]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import shapefile
+
+from geometry_to_spatialite.shapefile import load_dbf
+
+FIELDS = [
+    (("N", 10, 0), lambda: random.randint(-99999, 99999)),
+    (("N", 16, 4), lambda: round(random.uniform(-1000, 1000), 4)),
+    (("F", 19, 8), lambda: random.random()),
+    (("L", 1, 0), lambda: random.random() > 0.5),
+    (("D", 8, 0), lambda: f"20{random.randint(10, 29)}0{random.randint(1, 9)}15"),
+    (("C", 30, 0), lambda: f"value {random.randint(0, 1000)}"),
+]
+
+
+def time_records(records):
+    start = time.perf_counter()
+    count = sum(1 for _ in records)
+    return count, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--features", type=int, default=20000)
+    parser.add_argument("--fields", type=int, default=200)
+    args = parser.parse_args()
+
+    fields = [FIELDS[i % len(FIELDS)] for i in range(args.fields)]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "wide")
+        with shapefile.Writer(path, shapeType=shapefile.POINT) as w:
+            for i, ((field_type, size, decimal), _) in enumerate(fields):
+                w.field(f"f{i}", field_type, size=size, decimal=decimal)
+            for i in range(args.features):
+                w.point(0, 0)
+                w.record(*[make_value() for _, make_value in fields])
+
+        size = os.path.getsize(path + ".dbf") / 1024**2
+        print(f"{args.features} records, {args.fields} fields, {size:,.1f} MB")
+        print(f"{'reader':<32}{'total (s)':>12}{'records/sec':>15}")
+
+        with shapefile.Reader(path) as sf:
+            pyshp = time_records(
+                record.as_dict(date_strings=True) for record in sf.iterRecords()
+            )
+        with shapefile.Reader(path) as sf:
+            results = {
+                "pyshp iterRecords": pyshp,
+                "load_dbf": time_records(load_dbf(sf)),
+            }
+
+    for name, (count, seconds) in results.items():
+        print(f"{name:<32}{seconds:>12.3f}{count / seconds:>15,.0f}")
+
+
+if __name__ == "__main__":
+    main()
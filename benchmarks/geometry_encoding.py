@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+
+"""Compare writing geometries to SpatiaLite as WKT and as WKB
+
+Generates large synthetic polygons, then times encoding each one with
+Shapely and inserting it through ST_GeomFromText or ST_GeomFromWKB.
+
+usage: python benchmarks/geometry_encoding.py [--features N] [--vertices N]
+"""
+
+import argparse
+import math
+import random
+import time
+
+from shapely.geometry import shape
+
+from geometry_to_spatialite.utils import create_connection
+
+PATHS = {
+    "wkt": (lambda geom: geom.wkt, "ST_GeomFromText(?, 4326)"),
+    "wkb": (lambda geom: geom.wkb, "ST_GeomFromWKB(?, 4326)"),
+}
+
+
+def make_polygon(vertices):
+    ring = [
+        [
+            math.cos(2 * math.pi * i / vertices) * random.uniform(0.99, 1.01),
+            math.sin(2 * math.pi * i / vertices) * random.uniform(0.99, 1.01),
+        ]
+        for i in range(vertices)
+    ]
+    ring.append(ring[0])
+    return {"type": "Polygon", "coordinates": [ring]}
+
+
+def run(db, geometries, encode, conversion):
+    db.conn.execute("DELETE FROM polygons;")
+
+    start = time.perf_counter()
+    values = [(encode(geom),) for geom in geometries]
+    encoded = time.perf_counter()
+    db.conn.executemany(
+        f"INSERT INTO polygons (geometry) VALUES ({conversion});", values
+    )
+    db.conn.commit()
+    inserted = time.perf_counter()
+
+    return {
+        "encode": encoded - start,
+        "insert": inserted - encoded,
+        "total": inserted - start,
+        "bytes": sum(len(value[0]) for value in values),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--features", type=int, default=200)
+    parser.add_argument("--vertices", type=int, default=10000)
+    parser.add_argument("--spatialite-extension", default=None)
+    args = parser.parse_args()
+
+    random.seed(0)
+    geometries = [shape(make_polygon(args.vertices)) for _ in range(args.features)]
+
+    db = create_connection(":memory:", args.spatialite_extension)
+    db.conn.execute("CREATE TABLE polygons (id INTEGER PRIMARY KEY);")
+    db.conn.execute(
+        "SELECT AddGeometryColumn('polygons', 'geometry', 4326, 'POLYGON', 2);"
+    )
+
+    print(f"{args.features} polygons x {args.vertices} vertices")
+    print(f"{'path':<6}{'encode (s)':>12}{'insert (s)':>12}{'total (s)':>12}{'MB':>10}")
+    for name, (encode, conversion) in PATHS.items():
+        result = run(db, geometries, encode, conversion)
+        print(
+            f"{name:<6}{result['encode']:>12.3f}{result['insert']:>12.3f}"
+            f"{result['total']:>12.3f}{result['bytes'] / 1e6:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
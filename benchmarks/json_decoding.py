@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+
+"""Compare the JSON decoders used to read GeoJSON and GeoJSONSeq files
+
+Generates a large synthetic FeatureCollection and the same features as
+GeoJSONSeq, then times decoding every feature. FeatureCollections are
+streamed by load_geojson with the json module, streamed again skipping
+their geometries as the infer_types="full" pre-scan does, then decoded as
+a whole document by each of the installed decoders. GeoJSONSeq lines are decoded
+with each of the installed decoders in turn.
+
+usage: python benchmarks/json_decoding.py [--features N] [--vertices N] [--properties N]
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import tempfile
+import time
+
+from geometry_to_spatialite.geojson import load_geojson
+from geometry_to_spatialite.geojsonseq import decode_lines, load_lines
+from geometry_to_spatialite.utils import DEFAULT_BATCH_SIZE, batched, json_decoders
+
+
+def make_feature(i, vertices, properties):
+    ring = [
+        [
+            round(math.cos(2 * math.pi * j / vertices) + random.uniform(-170, 170), 6),
+            round(math.sin(2 * math.pi * j / vertices) + random.uniform(-80, 80), 6),
+        ]
+        for j in range(vertices)
+    ]
+    ring.append(ring[0])
+    return {
+        "type": "Feature",
+        "id": i,
+        "geometry": {"type": "Polygon", "coordinates": [ring]},
+        "properties": {f"prop{j}": f"value {i} {j}" for j in range(properties)},
+    }
+
+
+def time_batches(batches):
+    # features are held in batches, as they are when importing,
+    # which makes the garbage collector part of the decoding cost
+    start = time.perf_counter()
+    count = sum(len(batch) for batch in batches)
+    return count, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--features", type=int, default=100000)
+    parser.add_argument("--vertices", type=int, default=20)
+    parser.add_argument("--properties", type=int, default=10)
+    args = parser.parse_args()
+
+    features = [
+        make_feature(i, args.vertices, args.properties) for i in range(args.features)
+    ]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        collection = os.path.join(tmpdir, "features.geojson")
+        with open(collection, "w") as f:
+            json.dump({"type": "FeatureCollection", "features": features}, f)
+        sequence = os.path.join(tmpdir, "features.geojsonseq")
+        with open(sequence, "w") as f:
+            for feature in features:
+                f.write(json.dumps(feature) + "\n")
+        del features
+
+        size = os.path.getsize(collection) / 1024**2
+        print(f"{args.features} features, {size:,.1f} MB")
+        print(f"{'input':<34}{'total (s)':>12}{'features/sec':>15}")
+
+        batches = batched(load_geojson(open(collection)), DEFAULT_BATCH_SIZE)
+        results = {"FeatureCollection (json stream)": time_batches(batches)}
+        batches = batched(
+            load_geojson(open(collection), skip_geometry=True), DEFAULT_BATCH_SIZE
+        )
+        results["FeatureCollection (no geometry)"] = time_batches(batches)
+        for name, loads in json_decoders().items():
+            batches = batched(load_geojson(open(collection), loads), DEFAULT_BATCH_SIZE)
+            results[f"FeatureCollection ({name})"] = time_batches(batches)
+        for name, loads in json_decoders().items():
+            batches = batched(load_lines(open(sequence, "rb")), DEFAULT_BATCH_SIZE)
+            results[f"GeoJSONSeq ({name})"] = time_batches(
+                decode_lines(batch, loads) for batch in batches
+            )
+
+    for name, (count, seconds) in results.items():
+        print(f"{name:<34}{seconds:>12.3f}{count / seconds:>15,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+
+"""Benchmark GeoJSON and SHP import throughput
+
+Generates synthetic point, line and polygon datasets locally, at
+several sizes and property widths, then imports each one and reports
+timings as JSON lines on stdout (or --output).
+
+Each case is run twice in a fresh process:
+
+* "stages" drives the import one stage at a time and times each of them:
+  reading features, making records, inserting and building the index
+* "end_to_end" calls geojson_to_spatialite/shp_to_spatialite as a user would
+
+Every result includes rows/sec and the peak RSS of the process which ran it.
+With --repeat, each case is run that many times and every run is reported.
+Modes (e.g. --modes default fast) compare import options against each other.
+
+usage: python benchmarks/run.py [--formats geojson shp] [--kinds point line polygon]
+    [--sizes 1000 10000] [--widths 4 40] [--modes default fast] [--repeat N]
+    [--output FILE]
+"""
+
+import argparse
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+import shapefile
+
+from geometry_to_spatialite.geojson import geojson_to_spatialite, read_geojson
+from geometry_to_spatialite.shapefile import read_shp, shp_to_spatialite
+from geometry_to_spatialite.utils import (
+    FeatureLoader,
+    GeometryTable,
+    batched,
+    create_connection,
+    transaction,
+)
+
+MODES = {
+    "default": {},
+    "fast": {"fast": True},
+    "workers": {"workers": os.cpu_count() or 1},
+}
+
+FORMATS = {
+    "geojson": (geojson_to_spatialite, read_geojson),
+    "shp": (shp_to_spatialite, read_shp),
+}
+
+
+def make_coordinates(kind, i):
+    x, y = random.uniform(-170, 170), random.uniform(-80, 80)
+    if kind == "point":
+        return [x, y]
+    if kind == "line":
+        return [[x + j * 0.01, y + math.sin(j) * 0.01] for j in range(20)]
+    ring = [
+        [x + math.cos(a * math.pi / 32) * 0.1, y + math.sin(a * math.pi / 32) * 0.1]
+        for a in range(64)
+    ]
+    return [ring + [ring[0]]]
+
+
+def make_properties(width, i):
+    return {
+        f"field{j}": (i * j if j % 2 == 0 else f"value {i} {j}") for j in range(width)
+    }
+
+
+def write_geojson(path, kind, size, width):
+    geom_type = {"point": "Point", "line": "LineString", "polygon": "Polygon"}[kind]
+    with open(path, "w") as f:
+        f.write('{"type": "FeatureCollection", "features": [')
+        for i in range(size):
+            if i:
+                f.write(",")
+            feature = {
+                "type": "Feature",
+                "geometry": {
+                    "type": geom_type,
+                    "coordinates": make_coordinates(kind, i),
+                },
+                "properties": make_properties(width, i),
+            }
+            json.dump(feature, f)
+        f.write("]}")
+
+
+def write_shp(path, kind, size, width):
+    shape_type = {
+        "point": shapefile.POINT,
+        "line": shapefile.POLYLINE,
+        "polygon": shapefile.POLYGON,
+    }[kind]
+    with shapefile.Writer(path, shapeType=shape_type) as w:
+        for j in range(width):
+            if j % 2 == 0:
+                w.field(f"field{j}", "N", 18, 0)
+            else:
+                w.field(f"field{j}", "C", 40)
+        for i in range(size):
+            coordinates = make_coordinates(kind, i)
+            if kind == "point":
+                w.point(*coordinates)
+            elif kind == "line":
+                w.line([coordinates])
+            else:
+                # shapefile exterior rings are clockwise
+                w.poly([list(reversed(coordinates[0]))])
+            w.record(**make_properties(width, i))
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return peak / 1024 / 1024
+    return peak / 1024
+
+
+def run_stages(function, reader, path, db_path, options):
+    db = create_connection(db_path, options.get("spatialite_extension"))
+    timings = {}
+
+    start = time.perf_counter()
+    features, columns = reader(path)
+    features = list(features)
+    timings["read"] = time.perf_counter() - start
+
+    loader = FeatureLoader(
+        db,
+        features,
+        "benchmark",
+        4326,
+        None,
+        columns,
+        None,
+        "GEOMETRY",
+    )
+    start = time.perf_counter()
+    batches = [
+        loader.make_records(batch) for batch in batched(features, loader.batch_size)
+    ]
+    timings["records"] = time.perf_counter() - start
+
+    # each stage is committed inside its own timing, as the
+    # end to end import has to wait for its commit too
+    start = time.perf_counter()
+    with transaction(db):
+        table = GeometryTable(db, "benchmark", 4326, "GEOMETRY")
+        table.create_table(loader.columns, None)
+        for records in batches:
+            table.insert(
+                records,
+                alter=True,
+                batch_size=loader.batch_size,
+                conversions=table.conversions,
+            )
+    timings["insert"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with transaction(db):
+        table.create_spatial_index()
+    timings["index"] = time.perf_counter() - start
+
+    db.conn.close()
+    return timings
+
+
+def run_end_to_end(function, reader, path, db_path, options):
+    start = time.perf_counter()
+    function(db_path, path, table_name="benchmark", **options)
+    return {"total": time.perf_counter() - start}
+
+
+def run_case(case):
+    function, reader = FORMATS[case["format"]]
+    runner = {"stages": run_stages, "end_to_end": run_end_to_end}[case["run"]]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        timings = runner(
+            function,
+            reader,
+            case["path"],
+            os.path.join(tmpdir, "benchmark.db"),
+            case["options"],
+        )
+    total = sum(timings.values())
+    return {
+        **{k: v for k, v in case.items() if k not in ("path", "options")},
+        "seconds": {k: round(v, 4) for k, v in timings.items()},
+        "rows_per_sec": round(case["size"] / total) if total else None,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--formats", nargs="+", default=list(FORMATS), choices=FORMATS)
+    parser.add_argument("--kinds", nargs="+", default=["point", "line", "polygon"])
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1000, 10000, 100000])
+    parser.add_argument("--widths", nargs="+", type=int, default=[4, 40])
+    parser.add_argument("--modes", nargs="+", default=["default"], choices=MODES)
+    parser.add_argument("--repeat", type=int, default=1, help="Runs of each case")
+    parser.add_argument("--spatialite-extension", default=None)
+    parser.add_argument("--output", default=None, help="File to write results to")
+    args = parser.parse_args(args)
+
+    output = open(args.output, "w") if args.output else sys.stdout
+    # each case runs in a new process so peak RSS is measured per case
+    context = multiprocessing.get_context("spawn")
+
+    with tempfile.TemporaryDirectory() as datadir:
+        for fmt, kind, size, width in itertools.product(
+            args.formats, args.kinds, args.sizes, args.widths
+        ):
+            random.seed(0)
+            path = os.path.join(datadir, f"{kind}-{size}-{width}.{fmt}")
+            if fmt == "geojson":
+                write_geojson(path, kind, size, width)
+            else:
+                write_shp(path, kind, size, width)
+
+            for mode, run in itertools.product(args.modes, ("stages", "end_to_end")):
+                if run == "stages" and mode != "default":
+                    continue
+                options = dict(MODES[mode])
+                options["spatialite_extension"] = args.spatialite_extension
+                case = {
+                    "format": fmt,
+                    "kind": kind,
+                    "size": size,
+                    "width": width,
+                    "mode": mode,
+                    "run": run,
+                    "path": path,
+                    "options": options,
+                }
+                for repeat in range(args.repeat):
+                    with context.Pool(1) as pool:
+                        result = pool.apply(run_case, (case,))
+                    result["repeat"] = repeat
+                    output.write(json.dumps(result) + "\n")
+                    output.flush()
+
+    if args.output:
+        output.close()
+
+
+if __name__ == "__main__":
+    main()
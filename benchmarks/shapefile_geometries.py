@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+
+"""Compare reading shapefile geometries through pyshp and straight into WKB
+
+Writes a large synthetic polygon shapefile, then times turning every
+feature's geometry into WKB ready to insert, first from pyshp's
+__geo_interface__ dicts and then with load_shp.
+
+usage: python benchmarks/shapefile_geometries.py [--features N] [--vertices N]
+"""
+
+import argparse
+import math
+import os
+import random
+import tempfile
+import time
+
+import shapefile
+
+from geometry_to_spatialite.shapefile import load_shp
+from geometry_to_spatialite.utils import DEFAULT_BATCH_SIZE, batched, geometries_to_wkb
+
+
+def make_ring(vertices):
+    x, y = random.uniform(-170, 170), random.uniform(-80, 80)
+    # clockwise, as shapefile exterior rings are
+    ring = [
+        [
+            x + math.cos(-2 * math.pi * j / vertices),
+            y + math.sin(-2 * math.pi * j / vertices),
+        ]
+        for j in range(vertices)
+    ]
+    ring.append(ring[0])
+    return ring
+
+
+def time_wkb(features):
+    start = time.perf_counter()
+    count = 0
+    for batch in batched(features, DEFAULT_BATCH_SIZE):
+        geometries_to_wkb([feature["geometry"] for feature in batch])
+        count += len(batch)
+    return count, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--features", type=int, default=100000)
+    parser.add_argument("--vertices", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "polygons")
+        with shapefile.Writer(path, shapeType=shapefile.POLYGON) as w:
+            w.field("id", "N")
+            for i in range(args.features):
+                w.poly([make_ring(args.vertices)])
+                w.record(i)
+
+        size = os.path.getsize(path + ".shp") / 1024**2
+        print(f"{args.features} features, {size:,.1f} MB")
+        print(f"{'reader':<32}{'total (s)':>12}{'features/sec':>15}")
+
+        sf = shapefile.Reader(path)
+        results = {
+            "pyshp __geo_interface__": time_wkb(
+                {"geometry": shape_record.shape.__geo_interface__}
+                for shape_record in sf.iterShapeRecords()
+            ),
+            "load_shp (WKB)": time_wkb(load_shp(shapefile.Reader(path))),
+        }
+        sf.close()
+
+    for name, (count, seconds) in results.items():
+        print(f"{name:<32}{seconds:>12.3f}{count / seconds:>15,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
 from .geojson import geojson_to_spatialite
+from .geojsonseq import geojsonseq_to_spatialite
+from .importer import Importer
 from .shapefile import shp_to_spatialite
-from .utils import DataImportError
+from .utils import DataImportError, ImportStats
@@ -1,32 +1,292 @@
+import gc
+import itertools
 import json
+import os
+import re
 import sys
 
 from sqlite_utils import suggest_column_types
 
 from .utils import (
+    DEFAULT_BATCH_SIZE,
+    INFER_TYPES,
     Command,
     DataImportError,
     FeatureLoader,
-    create_connection,
+    FeatureSource,
     filename_to_table_name,
+    find_json_decoder,
+    spatialite_database,
 )
 
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+STRING = r'"[^"\\]*(?:\\.[^"\\]*)*"'
+OBJECT_KEY = re.compile(rf"[ \t\n\r]*({STRING})[ \t\n\r]*:[ \t\n\r]*", re.DOTALL)
+OBJECT_SEPARATOR = re.compile(r"[ \t\n\r]*([,}])")
+EMPTY_OBJECT = re.compile(r"\{[ \t\n\r]*}")
+# a run of anything but braces, where braces inside strings don't count
+UNBRACED = re.compile(rf'[^"{{}}]*(?:{STRING}[^"{{}}]*)*', re.DOTALL)
 
-def load_geojson(geojson_file):
-    with open(geojson_file, "r") as f:
-        gj = json.load(f)
+# number of features used to guess column types when infer_types="sample"
+SAMPLE_SIZE = 100
 
-    if gj["type"] != "FeatureCollection":
-        raise DataImportError(
-            f"{geojson_file} must be a valid GeoJSON FeatureCollection"
-        )
 
-    for feature in gj["features"]:
-        if "id" in feature:
-            feature["properties"]["id"] = feature["id"]
-            feature.pop("id", None)
+class JSONStream:
+    """Incrementally decode JSON values from a text file
+
+    Only as much of the file as is needed to decode the next value
+    is held in memory at any time.
+    """
+
+    def __init__(self, f, chunk_size=65536):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _read(self):
+        # read at least as much again as we're already holding so that
+        # values larger than chunk_size don't take quadratic time to decode
+        pos = self.pos
+        chunk = self.f.read(max(self.chunk_size, len(self.buffer) - pos))
+        if not chunk:
+            self.eof = True
+        self.buffer = self.buffer[pos:] + chunk
+        self.pos = 0
+
+    def _skip_whitespace(self):
+        while True:
+            self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer) or self.eof:
+                return
+            self._read()
+
+    def peek(self):
+        self._skip_whitespace()
+        if self.pos < len(self.buffer):
+            return self.buffer[self.pos]
+        return ""
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise json.JSONDecodeError(f"Expecting '{char}'", self.buffer, self.pos)
+        self.pos += 1
+
+    def start(self, open_char, close_char):
+        """Consume the start of an array or object and return True if it has items"""
+        self.expect(open_char)
+        if self.peek() == close_char:
+            self.pos += 1
+            return False
+        return True
+
+    def next_item(self, close_char):
+        """Consume a separator and return True if another item follows"""
+        if self.peek() == ",":
+            self.pos += 1
+            return True
+        self.expect(close_char)
+        return False
+
+    def value(self):
+        self._skip_whitespace()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # a number at the end of the buffer may be truncated,
+                # so only accept it if something follows it
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._read()
+
+    def object_without(self, skip_key):
+        """Decode an object, leaving out the value of one of its keys
+
+        If that value is an object, only the strings and braces in it
+        are looked at, so long arrays of numbers, such as coordinates,
+        are passed over without being parsed.
+        """
+        self._skip_whitespace()
+        while True:
+            try:
+                value = self._object_without(skip_key)
+                if value is not None:
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            if self.eof:
+                raise json.JSONDecodeError("Unterminated object", self.buffer, self.pos)
+            self._read()
+
+    def _object_without(self, skip_key):
+        # returns None if the object doesn't end within the buffer
+        buffer = self.buffer
+        if not buffer.startswith("{", self.pos):
+            raise json.JSONDecodeError("Expecting '{'", buffer, self.pos)
+        match = EMPTY_OBJECT.match(buffer, self.pos)
+        if match is not None:
+            self.pos = match.end()
+            return {}
+        obj = {}
+        pos = self.pos + 1
+        while True:
+            match = OBJECT_KEY.match(buffer, pos)
+            if match is None:
+                return None
+            key = json.loads(match[1]) if "\\" in match[1] else match[1][1:-1]
+            pos = match.end()
+            if key == skip_key and buffer.startswith("{", pos):
+                pos = object_end(buffer, pos)
+                if pos is None:
+                    return None
+            else:
+                value, pos = self.decoder.raw_decode(buffer, pos)
+                if key != skip_key:
+                    obj[key] = value
+            match = OBJECT_SEPARATOR.match(buffer, pos)
+            if match is None:
+                return None
+            pos = match.end()
+            if match[1] == "}":
+                self.pos = pos
+                return obj
+
+
+def object_end(buffer, pos):
+    """Return the position just after the object starting at pos in a buffer
+
+    None is returned if the object doesn't end within the buffer.
+    """
+    depth = 0
+    while True:
+        pos = UNBRACED.match(buffer, pos).end()
+        if pos == len(buffer) or buffer[pos] == '"':
+            return None
+        depth += 1 if buffer[pos] == "{" else -1
+        pos += 1
+        if not depth:
+            return pos
+
+
+def load_geojson(f, loads=None, skip_geometry=False):
+    """Lazily yield the features from an open GeoJSON FeatureCollection file
+
+    The features array is decoded one feature at a time,
+    so memory use doesn't grow with the size of the file.
+    If ``skip_geometry`` is true, each feature's geometry is passed
+    over without being decoded and left out of the feature.
+    If a ``loads`` function is given, the whole file is decoded
+    with it in one go instead, which is faster but needs enough
+    memory to hold every feature at once, and always decodes
+    the geometries.
+    The file is closed once all of its features have been read.
+    """
+    error = DataImportError(f"{f.name} must be a valid GeoJSON FeatureCollection")
+
+    if loads is not None:
+        with f:
+            document = f.read()
+        # decoded JSON can't contain reference cycles, so there's nothing
+        # for the garbage collector to find, but it would otherwise scan
+        # the growing document again and again while it is decoded
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            collection = loads(document)
+        finally:
+            if gc_enabled:
+                gc.enable()
+        del document
+        if not isinstance(collection, dict) or collection.get("type") != (
+            "FeatureCollection"
+        ):
+            raise error
+        yield from collection.get("features", [])
+        return
+
+    with f:
+        stream = JSONStream(f)
+        gj_type = None
+
+        more = stream.start("{", "}")
+        while more:
+            key = stream.value()
+            stream.expect(":")
+
+            if key == "features":
+                more_features = stream.start("[", "]")
+                while more_features:
+                    if skip_geometry:
+                        yield stream.object_without("geometry")
+                    else:
+                        yield stream.value()
+                    more_features = stream.next_item("]")
+            else:
+                value = stream.value()
+                if key == "type":
+                    gj_type = value
+                    if gj_type != "FeatureCollection":
+                        raise error
+
+            more = stream.next_item("}")
+
+    if gj_type != "FeatureCollection":
+        raise error
+
+
+def feature_properties(feature):
+    """Return a feature's properties, with its id if it has one
+
+    This is only used to work out column types. When records are made,
+    the id is added to the properties without making a new dict.
+    """
+    properties = feature["properties"] or {}
+    if "id" in feature:
+        return {**properties, "id": feature["id"]}
+    return properties
 
-    return gj
+
+def collection_loads(json_decoder):
+    # FeatureCollections are streamed with the json module unless
+    # another decoder is asked for, as it has to read the whole file
+    if json_decoder is None or json_decoder == "json":
+        return None
+    return find_json_decoder(json_decoder)
+
+
+def scan_geojson_columns(geojson_file):
+    """Return the column types of every feature in a GeoJSON file
+
+    This is a separate pass over the file. Features are streamed
+    and their geometries are skipped without being decoded.
+    """
+    features = load_geojson(open(geojson_file, "r"), skip_geometry=True)
+    return suggest_column_types(feature_properties(feature) for feature in features)
+
+
+def read_geojson(geojson_file, infer_types="sample", json_decoder=None):
+    """Return a lazy iterable of the features in a GeoJSON file and its column types"""
+    if infer_types not in INFER_TYPES:
+        raise ValueError(f"infer_types must be one of {str(INFER_TYPES)}")
+    loads = collection_loads(json_decoder)
+
+    f = open(geojson_file, "r")
+    size = os.fstat(f.fileno()).st_size
+    features = load_geojson(f, loads)
+    sample = list(itertools.islice(features, SAMPLE_SIZE))
+    if infer_types == "full":
+        columns = scan_geojson_columns(geojson_file)
+    else:
+        columns = suggest_column_types([feature_properties(f) for f in sample])
+    source = FeatureSource(itertools.chain(sample, features), f.buffer.tell, size)
+    return source, columns
 
 
 def geojson_to_spatialite(
@@ -38,11 +298,25 @@ def geojson_to_spatialite(
     pk=None,
     write_mode=None,
     geom_type="GEOMETRY",
+    batch_size=DEFAULT_BATCH_SIZE,
+    workers=1,
+    fast=False,
+    index_strategy="incremental",
+    observer=None,
+    spatial_metadata="full",
+    simplify=None,
+    precision=None,
+    simplified_column=None,
+    source_srid=None,
+    infer_types="sample",
+    json_decoder=None,
 ):
     """Load a GeoJSON file into a SpatiaLite database
 
     Args:
-        sqlite_db (str): Name of the SQLite database file
+        sqlite_db (Union[str, sqlite_utils.Database]): Name of the SQLite database
+            file, or an open Database to import into. An open Database is left
+            open, so one connection can be reused for many imports.
         geojson_file (str): Path to a GeoJSON file to import
         table_name (str, optional): Custom table name.
             Default: ``None`` (use the GeoJSON file name)
@@ -50,17 +324,74 @@ def geojson_to_spatialite(
             cases the spatialite extension can be automatically detected and loaded.
             If not you can manully pass a path to the .so .dylib or .dll file.
             Default: ``None`` (attempt to load automatically)
-        srid (int, optional): Spatial Reference ID (SRID).
+        srid (int, optional): Spatial Reference ID (SRID) of the table.
             Default: ``4326``
         pk (Union[str, list, tuple], optional): Field (str) or fields (list/tuple) to
-            use as a primary key.
+            use as a primary key. Every feature must have a key which isn't used
+            by another feature. No field of the key may be null.
             Default: ``None`` (no primary key)
         write_mode (str, optional): By default we assume the target table does not
             already exist. Pass 'replace' or 'append' to overwrite or append to an
-            existing table.
+            existing table. Pass 'upsert' to insert new rows and update changed
+            rows, matched by ``pk``. Rows which haven't changed are not rewritten.
+            'sync' does the same and also deletes rows whose keys aren't in the
+            input file.
             Default: ``None`` (assume the table doesn't already exist)
         geom_type (str, optional): Data type to use for the geometry column.
             Default: ``"GEOMETRY"``
+        batch_size (int, optional): Number of features to parse and insert at a time.
+            Memory use is proportional to the batch size.
+            Default: ``1000``
+        workers (int, optional): Number of processes to use for turning features
+            into records. Records are still written by a single connection.
+            Default: ``1`` (make records in the current process)
+        fast (bool, optional): Use faster SQLite settings while importing. If the
+            import is interrupted by a crash or power loss, the database may be
+            left corrupt. Only use this on a database you can re-create.
+            Default: ``False``
+        index_strategy (str, optional): How to maintain the spatial index when
+            appending to a table which already has one. ``"incremental"`` updates
+            the index as each row is inserted. ``"rebuild"`` drops the index before
+            inserting and builds it again from scratch afterwards, which is much
+            faster when appending a large number of rows.
+            Default: ``"incremental"``
+        observer (callable, optional): Called with an ``ImportStats`` after each
+            batch of records is written, and once more when the import is done.
+            Its ``features``, ``bytes_read``, ``stages`` and ``done`` attributes
+            can be used to report progress or collect timings.
+            Default: ``None``
+        spatial_metadata (str, optional): How to initialise the spatial metadata
+            in a new database. ``"full"`` adds every SRID SpatiaLite knows about
+            to ``spatial_ref_sys``. ``"minimal"`` starts with an empty
+            ``spatial_ref_sys`` and only adds the SRIDs which are used, which is
+            much faster and makes a much smaller database file.
+            Default: ``"full"``
+        simplify (float, optional): Simplify geometries with this tolerance, in the
+            units of the input coordinates. Topology is preserved, so polygons
+            don't collapse or become invalid.
+            Default: ``None`` (store geometries as they are)
+        precision (float, optional): Snap coordinates to a grid of this size, in
+            the units of the input coordinates. Needs Shapely 2.
+            Default: ``None`` (keep the full input precision)
+        simplified_column (str, optional): Store the simplified geometries in this
+            column, and keep the original geometries in ``geometry``. Needs
+            ``simplify``.
+            Default: ``None`` (store the simplified geometries in ``geometry``)
+        source_srid (int, optional): SRID of the coordinates in the file.
+            Geometries are reprojected to ``srid`` by SpatiaLite as they are
+            inserted if it is different.
+            Default: ``None`` (the same as ``srid``)
+        infer_types (str, optional): How to work out the column types.
+            ``"sample"`` uses the first 100 features, and adds any columns which
+            only appear later on while inserting. ``"full"`` reads every feature's
+            properties in a separate pass before importing, so the table is
+            created once with the right schema for the whole file.
+            Default: ``"sample"``
+        json_decoder (str, optional): JSON decoder to use, ``"orjson"``,
+            ``"msgspec"`` or ``"json"``. The file is streamed one feature at a
+            time by the ``json`` module. The other decoders are faster, but
+            decode the whole file at once, so memory use grows with its size.
+            Default: ``None`` (stream the file with the ``json`` module)
 
     Returns:
         ``None``
@@ -68,17 +399,42 @@ def geojson_to_spatialite(
     Raises:
         DataImportError
     """
-    db = create_connection(sqlite_db, spatialite_extension)
-    featurecollection = load_geojson(geojson_file)
-    features = featurecollection["features"]
-    columns = suggest_column_types([f["properties"] for f in features[0:100]])
-    name = table_name or filename_to_table_name(geojson_file)
-    loader = FeatureLoader(db, features, name, srid, pk, columns, write_mode, geom_type)
-    loader.load()
-    db.conn.close()
+    with spatialite_database(sqlite_db, spatialite_extension, spatial_metadata) as db:
+        features, columns = read_geojson(geojson_file, infer_types, json_decoder)
+        name = table_name or filename_to_table_name(geojson_file)
+        loader = FeatureLoader(
+            db,
+            features,
+            name,
+            srid,
+            pk,
+            columns,
+            write_mode,
+            geom_type,
+            batch_size=batch_size,
+            workers=workers,
+            fast=fast,
+            index_strategy=index_strategy,
+            observer=observer,
+            simplify=simplify,
+            precision=precision,
+            simplified_column=simplified_column,
+            source_srid=source_srid,
+            spatial_metadata=spatial_metadata,
+        )
+        loader.load()
 
 
-cli = Command(geojson_to_spatialite, "GeoJSON")
+cli = Command(
+    geojson_to_spatialite,
+    read_geojson,
+    "GeoJSON",
+    infers_types=True,
+    json_decoder_help=(
+        "JSON decoder to use. 'orjson' and 'msgspec' are faster than 'json' "
+        "if installed, but read the whole file into memory, default='json'"
+    ),
+)
 
 
 def main():
@@ -92,4 +448,19 @@ def main():
         srid=args.srid,
         geom_type=args.geom_type,
         spatialite_extension=args.spatialite_extension,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        jobs=args.jobs,
+        fast=args.fast,
+        index_strategy=args.index_strategy,
+        progress=args.progress,
+        stats=args.stats,
+        spatial_metadata=args.spatial_metadata,
+        skip_unchanged=args.skip_unchanged,
+        simplify=args.simplify,
+        precision=args.precision,
+        simplified_column=args.simplified_column,
+        source_srid=args.source_srid,
+        infer_types=args.infer_types,
+        json_decoder=args.json_decoder,
     )
@@ -0,0 +1,298 @@
+import functools
+import itertools
+import os
+import sys
+
+from sqlite_utils import suggest_column_types
+
+from .geojson import SAMPLE_SIZE, feature_properties
+from .utils import (
+    DEFAULT_BATCH_SIZE,
+    INFER_TYPES,
+    STDIN,
+    Command,
+    DataImportError,
+    FeatureLoader,
+    FeatureSource,
+    batched,
+    filename_to_table_name,
+    find_json_decoder,
+    spatialite_database,
+)
+
+# RFC 8142 puts a record separator before each GeoJSON text
+RECORD_SEPARATOR = b"\x1e"
+SEPARATORS = RECORD_SEPARATOR + b" \t\r\n"
+
+# each line is a separate document, so the fastest installed
+# decoder is used by default instead of the json module
+json_loads = find_json_decoder()
+
+
+def load_lines(f):
+    """Lazily yield the non-blank lines from an open GeoJSONSeq file
+
+    Lines are yielded as bytes, without being decoded, so that they can be
+    parsed in worker processes. The file is closed once it has been read.
+    """
+    with f:
+        for line in f:
+            if line.strip(SEPARATORS):
+                yield line
+
+
+def decode_lines(lines, loads=json_loads):
+    """Decode a batch of lines from a GeoJSONSeq file into features
+
+    Lines are decoded with ``loads``, which defaults to the fastest
+    JSON decoder that is installed.
+    """
+    features = []
+    for line in lines:
+        try:
+            feature = loads(line.lstrip(RECORD_SEPARATOR))
+        except ValueError as e:
+            raise DataImportError(f"GeoJSONSeq input contains invalid JSON: {e}") from e
+        if not isinstance(feature, dict) or feature.get("type") != "Feature":
+            raise DataImportError(
+                "Every line of GeoJSONSeq input must be a GeoJSON Feature"
+            )
+        features.append(feature)
+    return features
+
+
+def open_geojsonseq(geojsonseq_file):
+    if geojsonseq_file == STDIN:
+        # closing this doesn't close stdin itself
+        return open(sys.stdin.fileno(), "rb", closefd=False)
+    return open(geojsonseq_file, "rb")
+
+
+def scan_geojsonseq_columns(geojsonseq_file, loads=json_loads):
+    """Return the column types of every feature in a GeoJSONSeq file"""
+    lines = load_lines(open_geojsonseq(geojsonseq_file))
+    return suggest_column_types(
+        feature_properties(feature)
+        for batch in batched(lines, DEFAULT_BATCH_SIZE)
+        for feature in decode_lines(batch, loads)
+    )
+
+
+def read_geojsonseq(geojsonseq_file, infer_types="sample", json_decoder=None):
+    """Return a lazy iterable of the lines in a GeoJSONSeq file and its column types
+
+    The lines are turned into features by ``decode_lines``.
+    """
+    if infer_types not in INFER_TYPES:
+        raise ValueError(f"infer_types must be one of {str(INFER_TYPES)}")
+    if infer_types == "full" and geojsonseq_file == STDIN:
+        raise ValueError("infer_types='full' can't be used when reading from stdin")
+    loads = find_json_decoder(json_decoder)
+
+    f = open_geojsonseq(geojsonseq_file)
+    size = None if geojsonseq_file == STDIN else os.fstat(f.fileno()).st_size
+    lines = load_lines(f)
+    sample = list(itertools.islice(lines, SAMPLE_SIZE))
+    if infer_types == "full":
+        columns = scan_geojsonseq_columns(geojsonseq_file, loads)
+    else:
+        columns = suggest_column_types(
+            [feature_properties(feature) for feature in decode_lines(sample, loads)]
+        )
+
+    lines = itertools.chain(sample, lines)
+    if size is None:
+        # there's no way to know how much input is left to read from a pipe
+        return lines, columns
+    return FeatureSource(lines, f.tell, size), columns
+
+
+def geojsonseq_to_spatialite(
+    sqlite_db,
+    geojsonseq_file,
+    table_name=None,
+    spatialite_extension=None,
+    srid=4326,
+    pk=None,
+    write_mode=None,
+    geom_type="GEOMETRY",
+    batch_size=DEFAULT_BATCH_SIZE,
+    workers=1,
+    fast=False,
+    index_strategy="incremental",
+    observer=None,
+    spatial_metadata="full",
+    simplify=None,
+    precision=None,
+    simplified_column=None,
+    source_srid=None,
+    infer_types="sample",
+    json_decoder=None,
+):
+    """Load a GeoJSONSeq file into a SpatiaLite database
+
+    GeoJSONSeq (RFC 8142) files have one GeoJSON Feature on each line,
+    optionally preceded by a record separator character. Newline-delimited
+    GeoJSON is read in the same way.
+
+    Args:
+        sqlite_db (Union[str, sqlite_utils.Database]): Name of the SQLite database
+            file, or an open Database to import into. An open Database is left
+            open, so one connection can be reused for many imports.
+        geojsonseq_file (str): Path to a GeoJSONSeq file to import, or ``"-"``
+            to read from stdin
+        table_name (str, optional): Custom table name. Needed when reading from
+            stdin.
+            Default: ``None`` (use the GeoJSONSeq file name)
+        spatialite_extension (str, optional): Path to mod_spatialite extension. In most
+            cases the spatialite extension can be automatically detected and loaded.
+            If not you can manully pass a path to the .so .dylib or .dll file.
+            Default: ``None`` (attempt to load automatically)
+        srid (int, optional): Spatial Reference ID (SRID) of the table.
+            Default: ``4326``
+        pk (Union[str, list, tuple], optional): Field (str) or fields (list/tuple) to
+            use as a primary key. Every feature must have a key which isn't used
+            by another feature. No field of the key may be null.
+            Default: ``None`` (no primary key)
+        write_mode (str, optional): By default we assume the target table does not
+            already exist. Pass 'replace' or 'append' to overwrite or append to an
+            existing table. Pass 'upsert' to insert new rows and update changed
+            rows, matched by ``pk``. Rows which haven't changed are not rewritten.
+            'sync' does the same and also deletes rows whose keys aren't in the
+            input file.
+            Default: ``None`` (assume the table doesn't already exist)
+        geom_type (str, optional): Data type to use for the geometry column.
+            Default: ``"GEOMETRY"``
+        batch_size (int, optional): Number of features to parse and insert at a time.
+            Memory use is proportional to the batch size.
+            Default: ``1000``
+        workers (int, optional): Number of processes to use for parsing lines and
+            turning them into records. Records are still written by a single
+            connection.
+            Default: ``1`` (parse lines in the current process)
+        fast (bool, optional): Use faster SQLite settings while importing. If the
+            import is interrupted by a crash or power loss, the database may be
+            left corrupt. Only use this on a database you can re-create.
+            Default: ``False``
+        index_strategy (str, optional): How to maintain the spatial index when
+            appending to a table which already has one. ``"incremental"`` updates
+            the index as each row is inserted. ``"rebuild"`` drops the index before
+            inserting and builds it again from scratch afterwards, which is much
+            faster when appending a large number of rows.
+            Default: ``"incremental"``
+        observer (callable, optional): Called with an ``ImportStats`` after each
+            batch of records is written, and once more when the import is done.
+            Its ``features``, ``bytes_read``, ``stages`` and ``done`` attributes
+            can be used to report progress or collect timings.
+            Default: ``None``
+        spatial_metadata (str, optional): How to initialise the spatial metadata
+            in a new database. ``"full"`` adds every SRID SpatiaLite knows about
+            to ``spatial_ref_sys``. ``"minimal"`` starts with an empty
+            ``spatial_ref_sys`` and only adds the SRIDs which are used, which is
+            much faster and makes a much smaller database file.
+            Default: ``"full"``
+        simplify (float, optional): Simplify geometries with this tolerance, in the
+            units of the input coordinates. Topology is preserved, so polygons
+            don't collapse or become invalid.
+            Default: ``None`` (store geometries as they are)
+        precision (float, optional): Snap coordinates to a grid of this size, in
+            the units of the input coordinates. Needs Shapely 2.
+            Default: ``None`` (keep the full input precision)
+        simplified_column (str, optional): Store the simplified geometries in this
+            column, and keep the original geometries in ``geometry``. Needs
+            ``simplify``.
+            Default: ``None`` (store the simplified geometries in ``geometry``)
+        source_srid (int, optional): SRID of the coordinates in the file.
+            Geometries are reprojected to ``srid`` by SpatiaLite as they are
+            inserted if it is different.
+            Default: ``None`` (the same as ``srid``)
+        infer_types (str, optional): How to work out the column types.
+            ``"sample"`` uses the first 100 features, and adds any columns which
+            only appear later on while inserting. ``"full"`` reads every feature's
+            properties in a separate pass before importing, so the table is
+            created once with the right schema for the whole file. ``"full"``
+            can't be used when reading from stdin.
+            Default: ``"sample"``
+        json_decoder (str, optional): JSON decoder to use for each line,
+            ``"orjson"``, ``"msgspec"`` or ``"json"``.
+            Default: ``None`` (the fastest one installed)
+
+    Returns:
+        ``None``
+
+    Raises:
+        DataImportError
+    """
+    if geojsonseq_file == STDIN and table_name is None:
+        raise ValueError("table_name is required when reading from stdin")
+
+    with spatialite_database(sqlite_db, spatialite_extension, spatial_metadata) as db:
+        lines, columns = read_geojsonseq(geojsonseq_file, infer_types, json_decoder)
+        name = table_name or filename_to_table_name(geojsonseq_file)
+        loader = FeatureLoader(
+            db,
+            lines,
+            name,
+            srid,
+            pk,
+            columns,
+            write_mode,
+            geom_type,
+            batch_size=batch_size,
+            workers=workers,
+            fast=fast,
+            index_strategy=index_strategy,
+            observer=observer,
+            simplify=simplify,
+            precision=precision,
+            simplified_column=simplified_column,
+            source_srid=source_srid,
+            decode=functools.partial(
+                decode_lines, loads=find_json_decoder(json_decoder)
+            ),
+            spatial_metadata=spatial_metadata,
+        )
+        loader.load()
+
+
+cli = Command(
+    geojsonseq_to_spatialite,
+    read_geojsonseq,
+    "GeoJSONSeq",
+    infers_types=True,
+    decode=decode_lines,
+    reads_stdin=True,
+    json_decoder_help=(
+        "JSON decoder to use for each line, "
+        "default=the fastest of 'orjson', 'msgspec' and 'json' installed"
+    ),
+)
+
+
+def main():
+    args = cli.parse_args(sys.argv[1:])
+    cli.invoke(
+        paths=args.paths,
+        dbname=args.dbname,
+        table=args.table,
+        primary_key=args.primary_key,
+        write_mode=args.write_mode,
+        srid=args.srid,
+        geom_type=args.geom_type,
+        spatialite_extension=args.spatialite_extension,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        jobs=args.jobs,
+        fast=args.fast,
+        index_strategy=args.index_strategy,
+        progress=args.progress,
+        stats=args.stats,
+        spatial_metadata=args.spatial_metadata,
+        skip_unchanged=args.skip_unchanged,
+        simplify=args.simplify,
+        precision=args.precision,
+        simplified_column=args.simplified_column,
+        source_srid=args.source_srid,
+        infer_types=args.infer_types,
+        json_decoder=args.json_decoder,
+    )
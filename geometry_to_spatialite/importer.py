@@ -0,0 +1,61 @@
+import contextlib
+
+from .geojson import geojson_to_spatialite
+from .geojsonseq import geojsonseq_to_spatialite
+from .shapefile import shp_to_spatialite
+from .utils import spatialite_database
+
+
+class Importer:
+    """Import many files into one SpatiaLite database over a single connection
+
+    The SpatiaLite extension is loaded and the spatial metadata is checked
+    once, when the importer is created, rather than once per file.
+
+    .. code-block:: python
+
+        with Importer("mydatabase.db") as importer:
+            importer.import_geojson("roads.geojson")
+            importer.import_shp("buildings.shp", write_mode="append")
+
+    Args:
+        sqlite_db (Union[str, sqlite_utils.Database]): Name of the SQLite database
+            file, or an open Database. A connection opened by the importer is
+            closed by ``close()``. An open Database is left open.
+        spatialite_extension (str, optional): Path to mod_spatialite extension.
+            Default: ``None`` (attempt to load automatically)
+        spatial_metadata (str, optional): How to initialise the spatial metadata
+            in a new database, ``"full"`` or ``"minimal"``.
+            Default: ``"full"``
+    """
+
+    def __init__(self, sqlite_db, spatialite_extension=None, spatial_metadata="full"):
+        self.spatial_metadata = spatial_metadata
+        self._stack = contextlib.ExitStack()
+        self.db = self._stack.enter_context(
+            spatialite_database(sqlite_db, spatialite_extension, spatial_metadata)
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+    def close(self):
+        self._stack.close()
+
+    def import_geojson(self, geojson_file, **kwargs):
+        """Load a GeoJSON file. Takes the same keyword arguments as ``geojson_to_spatialite``"""
+        kwargs.setdefault("spatial_metadata", self.spatial_metadata)
+        geojson_to_spatialite(self.db, geojson_file, **kwargs)
+
+    def import_geojsonseq(self, geojsonseq_file, **kwargs):
+        """Load a GeoJSONSeq file. Takes the same keyword arguments as ``geojsonseq_to_spatialite``"""
+        kwargs.setdefault("spatial_metadata", self.spatial_metadata)
+        geojsonseq_to_spatialite(self.db, geojsonseq_file, **kwargs)
+
+    def import_shp(self, shp_file, **kwargs):
+        """Load a SHP file. Takes the same keyword arguments as ``shp_to_spatialite``"""
+        kwargs.setdefault("spatial_metadata", self.spatial_metadata)
+        shp_to_spatialite(self.db, shp_file, **kwargs)
@@ -1,8 +1,25 @@
+import os
+import sqlite3
+import struct
 import sys
 
 import shapefile
 
-from .utils import Command, FeatureLoader, create_connection, filename_to_table_name
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .utils import (
+    DEFAULT_BATCH_SIZE,
+    SOURCE_SRID_FROM_PRJ,
+    Command,
+    DataImportError,
+    FeatureLoader,
+    FeatureSource,
+    filename_to_table_name,
+    spatialite_database,
+)
 
 
 def shp_field_to_sql_type(field):
@@ -17,6 +34,298 @@ def shp_field_to_sql_type(field):
     return "TEXT"
 
 
+SHP_HEADER_SIZE = 100
+RECORD_HEADER = struct.Struct(">2i")  # record number, content length in words
+PARTS_HEADER = struct.Struct("<4d2i")  # bounding box, number of parts and points
+WKB_HEADER = struct.Struct("<BII")  # byte order, geometry type, number of items
+WKB_COUNT = struct.Struct("<I")
+WKB_POINT_HEADER = struct.pack("<BI", 1, 1)
+
+# shapefile shape types
+NULL_SHAPE = 0
+POINT = 1
+POLYLINE = 3
+POLYGON = 5
+MULTIPOINT = 8
+
+# WKB geometry types
+WKB_LINESTRING = 2
+WKB_POLYGON = 3
+WKB_MULTIPOINT = 4
+WKB_MULTILINESTRING = 5
+WKB_MULTIPOLYGON = 6
+
+
+def read_parts(content):
+    """Return the points of a PolyLine or Polygon record and the start and end of each part"""
+    _, _, _, _, num_parts, num_points = PARTS_HEADER.unpack_from(content, 4)
+    start = 4 + PARTS_HEADER.size
+    parts = struct.unpack_from(f"<{num_parts}i", content, start)
+    start += 4 * num_parts
+    end = start + 16 * num_points
+    points = content[start:end]
+    return points, list(zip(parts, parts[1:] + (num_points,)))
+
+
+def wkb_points(points, start, end):
+    # shapefiles and little-endian WKB store points as the same pairs of
+    # doubles, so a part's points are copied across without being unpacked
+    first, last = 16 * start, 16 * end
+    return WKB_COUNT.pack(end - start) + points[first:last]
+
+
+def wkb_polygon(points, rings):
+    return b"".join(
+        [WKB_HEADER.pack(1, WKB_POLYGON, len(rings))]
+        + [wkb_points(points, start, end) for start, end in rings]
+    )
+
+
+def is_clockwise(points, start, end):
+    if numpy is None:
+        raise ValueError("ring orientation needs numpy")
+    xy = numpy.frombuffer(points, "<f8", (end - start) * 2, start * 16)
+    x, y = xy[0::2], xy[1::2]
+    return numpy.dot(x[:-1], y[1:]) - numpy.dot(x[1:], y[:-1]) < 0
+
+
+def shp_record_to_wkb(content):
+    """Convert the content of a .shp record to WKB
+
+    Returns ``None`` for a null shape. Raises ``ValueError`` for shapes which
+    have to be read by pyshp instead, like those with Z or M values.
+    Geometries are the same as pyshp's ``__geo_interface__`` would give.
+    """
+    (shape_type,) = struct.unpack_from("<i", content)
+    if shape_type == NULL_SHAPE:
+        return None
+
+    if shape_type == POINT:
+        return WKB_POINT_HEADER + content[4:20]
+
+    if shape_type == MULTIPOINT:
+        (num_points,) = struct.unpack_from("<i", content, 36)
+        end = 40 + 16 * num_points
+        return b"".join(
+            [WKB_HEADER.pack(1, WKB_MULTIPOINT, num_points)]
+            + [
+                WKB_POINT_HEADER + point
+                for (point,) in struct.iter_unpack("16s", content[40:end])
+            ]
+        )
+
+    if shape_type == POLYLINE:
+        points, parts = read_parts(content)
+        if len(parts) == 0:
+            return WKB_HEADER.pack(1, WKB_LINESTRING, 0)
+        if len(parts) == 1:
+            return struct.pack("<BI", 1, WKB_LINESTRING) + wkb_points(points, *parts[0])
+        return b"".join(
+            [WKB_HEADER.pack(1, WKB_MULTILINESTRING, len(parts))]
+            + [
+                struct.pack("<BI", 1, WKB_LINESTRING) + wkb_points(points, start, end)
+                for start, end in parts
+            ]
+        )
+
+    if shape_type == POLYGON:
+        points, rings = read_parts(content)
+        if len(rings) <= 1:
+            return wkb_polygon(points, rings)
+
+        # exterior rings are clockwise and holes are anticlockwise. Only
+        # the simple cases are handled here. Matching holes to exteriors
+        # when there is more than one of each is left to pyshp
+        clockwise = [is_clockwise(points, start, end) for start, end in rings]
+        exteriors = sum(clockwise)
+        if exteriors == 1:
+            exterior = clockwise.index(True)
+            rings.insert(0, rings.pop(exterior))
+            return wkb_polygon(points, rings)
+        if exteriors == 0 or exteriors == len(rings):
+            return b"".join(
+                [WKB_HEADER.pack(1, WKB_MULTIPOLYGON, len(rings))]
+                + [wkb_polygon(points, [ring]) for ring in rings]
+            )
+
+    raise ValueError(f"shape type {shape_type} is read by pyshp")
+
+
+DBF_HEADER = struct.Struct("<4xIHH20x")  # number of records, header and record length
+DBF_LOGICAL = {
+    **dict.fromkeys([b"Y", b"y", b"T", b"t", b"1"], True),
+    **dict.fromkeys([b"N", b"n", b"F", b"f", b"0"], False),
+}
+
+
+def dbf_number(value):
+    # numbers are right-aligned text. QGIS writes nulls as asterisks
+    return value.partition(b"\x00")[0].strip(b"*")
+
+
+def dbf_int(value):
+    value = dbf_number(value)
+    try:
+        return int(value)
+    except ValueError:
+        try:
+            return int(float(value))
+        except ValueError:
+            return None
+
+
+def dbf_float(value):
+    try:
+        return float(dbf_number(value))
+    except ValueError:
+        return None
+
+
+def dbf_date(value):
+    # dates are kept as YYYYMMDD strings, like pyshp's
+    # as_dict(date_strings=True). A blank or zero date is null.
+    # Like pyshp, a malformed date is kept as it is instead of failing
+    if not value.strip(b"\x00 0"):
+        return None
+    return value.decode("ascii", errors="replace")
+
+
+def dbf_column_converter(field, encoding, encoding_errors):
+    """Return a function which converts a whole column of a DBF field's raw values
+
+    Values are converted in the same way as pyshp converts them.
+    """
+    _, field_type, _, decimal = field
+    if field_type in ("N", "F"):
+        convert = dbf_float if decimal else dbf_int
+        parse = float if decimal else int
+
+        def convert_numbers(values):
+            try:
+                # int() and float() ignore padding, so nearly every
+                # column can be converted without looking at each value
+                return list(map(parse, values))
+            except ValueError:
+                return list(map(convert, values))
+
+        return convert_numbers
+    if field_type == "L":
+        return lambda values: [DBF_LOGICAL.get(value) for value in values]
+    if field_type == "D":
+        return lambda values: list(map(dbf_date, values))
+    return lambda values: [
+        value.rstrip(b" \x00").decode(encoding, encoding_errors) for value in values
+    ]
+
+
+def load_dbf(sf, batch_size=DEFAULT_BATCH_SIZE):
+    """Lazily yield the records of a shapefile's .dbf file as property dicts
+
+    Records are read ``batch_size`` at a time and split into their fields
+    with a single ``struct.iter_unpack`` call. Each field is then converted
+    a column at a time. ``None`` is yielded for deleted records, so that
+    records stay aligned with their shapes.
+    """
+    dbf = sf.dbf
+    dbf.seek(0)
+    num_records, header_length, record_length = DBF_HEADER.unpack(
+        dbf.read(DBF_HEADER.size)
+    )
+    fields = [f for f in sf.fields if f[0] != "DeletionFlag"]
+    names = [f[0] for f in fields]
+    converters = [
+        dbf_column_converter(f, sf.encoding, sf.encodingErrors) for f in fields
+    ]
+    # the deletion flag, then each field, then any padding
+    record_format = "".join(["<1s"] + [f"{f[2]}s" for f in fields])
+    padding = record_length - struct.calcsize(record_format)
+    if padding:
+        record_format += f"{padding}x"
+
+    dbf.seek(header_length)
+    remaining = num_records
+    while remaining > 0:
+        block = dbf.read(min(batch_size, remaining) * record_length)
+        count = len(block) // record_length
+        if count == 0:
+            return
+        remaining -= count
+        end = count * record_length
+        rows = struct.iter_unpack(record_format, block[:end])
+        flags, *columns = zip(*rows)
+        columns = [convert(column) for convert, column in zip(converters, columns)]
+        for flag, row in zip(flags, zip(*columns)):
+            yield dict(zip(names, row)) if flag == b" " else None
+
+
+def load_shp(sf):
+    """Lazily yield the features from an open shapefile.Reader
+
+    Shapes are read from the .shp file one at a time, and records from the
+    .dbf file a batch at a time, so memory use doesn't grow with the size
+    of the file. Geometries
+    are copied from the .shp file into WKB without making Python objects
+    for their coordinates. Any which can't be are read by pyshp as
+    GeoJSON-like dicts instead.
+    """
+    with sf:
+        shp = sf.shp
+        shp.seek(SHP_HEADER_SIZE)
+        for i, properties in enumerate(load_dbf(sf)):
+            header = shp.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            _, length = RECORD_HEADER.unpack(header)
+            content = memoryview(shp.read(length * 2))
+            if properties is None:
+                # deleted record
+                continue
+            try:
+                geometry = shp_record_to_wkb(content)
+            except ValueError:
+                position = shp.tell()
+                geometry = sf.shape(i).__geo_interface__
+                shp.seek(position)
+            yield {"type": "Feature", "properties": properties, "geometry": geometry}
+
+
+def read_shp(shp_file):
+    """Return a lazy iterable of the features in a SHP file and its column types"""
+    sf = shapefile.Reader(shp_file)
+    columns = {
+        f[0]: shp_field_to_sql_type(f) for f in sf.fields if f[0] != "DeletionFlag"
+    }
+    source = FeatureSource(
+        load_shp(sf),
+        lambda: sf.shp.tell() + sf.dbf.tell(),
+        os.fstat(sf.shp.fileno()).st_size + os.fstat(sf.dbf.fileno()).st_size,
+    )
+    return source, columns
+
+
+def prj_srid(db, shp_file):
+    """Return the SRID described by a SHP file's .prj file
+
+    Raises ``DataImportError`` if there is no .prj file, or SpatiaLite can't
+    match it to a known SRID.
+    """
+    prj_file = os.path.splitext(shp_file)[0] + ".prj"
+    if not os.path.exists(prj_file):
+        raise DataImportError(f"{shp_file} has no .prj file to read its SRID from")
+    with open(prj_file, encoding="utf-8", errors="replace") as f:
+        wkt = f.read()
+    try:
+        srid = db.conn.execute("SELECT PROJ_GuessSridFromWKT(?);", [wkt]).fetchone()[0]
+    except sqlite3.OperationalError as e:
+        raise DataImportError(
+            "Reading the SRID from a .prj file needs SpatiaLite "
+            "to be built with PROJ 6 or later"
+        ) from e
+    if srid is None or srid <= 0:
+        raise DataImportError(f"The SRID of {prj_file} couldn't be recognised")
+    return srid
+
+
 def shp_to_spatialite(
     sqlite_db,
     shp_file,
@@ -26,11 +335,23 @@ def shp_to_spatialite(
     pk=None,
     write_mode=None,
     geom_type="GEOMETRY",
+    batch_size=DEFAULT_BATCH_SIZE,
+    workers=1,
+    fast=False,
+    index_strategy="incremental",
+    observer=None,
+    spatial_metadata="full",
+    simplify=None,
+    precision=None,
+    simplified_column=None,
+    source_srid=None,
 ):
     """Load a SHP file into a SpatiaLite database
 
     Args:
-        sqlite_db (str): Name of the SQLite database file
+        sqlite_db (Union[str, sqlite_utils.Database]): Name of the SQLite database
+            file, or an open Database to import into. An open Database is left
+            open, so one connection can be reused for many imports.
         shp_file (str): Path to a SHP file to import
         table_name (str, optional): Custom table name.
             Default: ``None`` (use the SHP file name)
@@ -38,17 +359,64 @@ def shp_to_spatialite(
             cases the spatialite extension can be automatically detected and loaded.
             If not you can manully pass a path to the .so .dylib or .dll file.
             Default: ``None`` (attempt to load automatically)
-        srid (int, optional): Spatial Reference ID (SRID).
+        srid (int, optional): Spatial Reference ID (SRID) of the table.
             Default: ``4326``
         pk (Union[str, list, tuple], optional): Field (str) or fields (list/tuple) to
-            use as a primary key.
+            use as a primary key. Every feature must have a key which isn't used
+            by another feature. No field of the key may be null.
             Default: ``None`` (no primary key)
         write_mode (str, optional): By default we assume the target table does not
             already exist. Pass 'replace' or 'append' to overwrite or append to an
-            existing table.
+            existing table. Pass 'upsert' to insert new rows and update changed
+            rows, matched by ``pk``. Rows which haven't changed are not rewritten.
+            'sync' does the same and also deletes rows whose keys aren't in the
+            input file.
             Default: ``None`` (assume the table doesn't already exist)
         geom_type (str, optional): Data type to use for the geometry column.
             Default: ``"GEOMETRY"``
+        batch_size (int, optional): Number of features to parse and insert at a time.
+            Memory use is proportional to the batch size.
+            Default: ``1000``
+        workers (int, optional): Number of processes to use for turning features
+            into records. Records are still written by a single connection.
+            Default: ``1`` (make records in the current process)
+        fast (bool, optional): Use faster SQLite settings while importing. If the
+            import is interrupted by a crash or power loss, the database may be
+            left corrupt. Only use this on a database you can re-create.
+            Default: ``False``
+        index_strategy (str, optional): How to maintain the spatial index when
+            appending to a table which already has one. ``"incremental"`` updates
+            the index as each row is inserted. ``"rebuild"`` drops the index before
+            inserting and builds it again from scratch afterwards, which is much
+            faster when appending a large number of rows.
+            Default: ``"incremental"``
+        observer (callable, optional): Called with an ``ImportStats`` after each
+            batch of records is written, and once more when the import is done.
+            Its ``features``, ``bytes_read``, ``stages`` and ``done`` attributes
+            can be used to report progress or collect timings.
+            Default: ``None``
+        spatial_metadata (str, optional): How to initialise the spatial metadata
+            in a new database. ``"full"`` adds every SRID SpatiaLite knows about
+            to ``spatial_ref_sys``. ``"minimal"`` starts with an empty
+            ``spatial_ref_sys`` and only adds the SRIDs which are used, which is
+            much faster and makes a much smaller database file.
+            Default: ``"full"``
+        simplify (float, optional): Simplify geometries with this tolerance, in the
+            units of the input coordinates. Topology is preserved, so polygons
+            don't collapse or become invalid.
+            Default: ``None`` (store geometries as they are)
+        precision (float, optional): Snap coordinates to a grid of this size, in
+            the units of the input coordinates. Needs Shapely 2.
+            Default: ``None`` (keep the full input precision)
+        simplified_column (str, optional): Store the simplified geometries in this
+            column, and keep the original geometries in ``geometry``. Needs
+            ``simplify``.
+            Default: ``None`` (store the simplified geometries in ``geometry``)
+        source_srid (Union[int, str], optional): SRID of the coordinates in the
+            file. Geometries are reprojected to ``srid`` by SpatiaLite as they
+            are inserted if it is different. Pass ``"prj"`` to read it from the
+            .prj file.
+            Default: ``None`` (the same as ``srid``)
 
     Returns:
         ``None``
@@ -56,19 +424,41 @@ def shp_to_spatialite(
     Raises:
         DataImportError
     """
-    db = create_connection(sqlite_db, spatialite_extension)
-    sf = shapefile.Reader(shp_file)
-    features = [rec.__geo_interface__ for rec in sf.shapeRecords()]
-    columns = {
-        f[0]: shp_field_to_sql_type(f) for f in sf.fields if f[0] != "DeletionFlag"
-    }
-    name = table_name or filename_to_table_name(shp_file)
-    loader = FeatureLoader(db, features, name, srid, pk, columns, write_mode, geom_type)
-    loader.load()
-    db.conn.close()
+    with spatialite_database(sqlite_db, spatialite_extension, spatial_metadata) as db:
+        features, columns = read_shp(shp_file)
+        name = table_name or filename_to_table_name(shp_file)
+        if source_srid == SOURCE_SRID_FROM_PRJ:
+            source_srid = prj_srid(db, shp_file)
+        loader = FeatureLoader(
+            db,
+            features,
+            name,
+            srid,
+            pk,
+            columns,
+            write_mode,
+            geom_type,
+            batch_size=batch_size,
+            workers=workers,
+            fast=fast,
+            index_strategy=index_strategy,
+            observer=observer,
+            simplify=simplify,
+            precision=precision,
+            simplified_column=simplified_column,
+            source_srid=source_srid,
+            spatial_metadata=spatial_metadata,
+        )
+        loader.load()
 
 
-cli = Command(shp_to_spatialite, "SHP")
+cli = Command(
+    shp_to_spatialite,
+    read_shp,
+    "SHP",
+    related_extensions=(".shx", ".dbf", ".prj", ".cpg"),
+    guess_srid=prj_srid,
+)
 
 
 def main():
@@ -82,4 +472,17 @@ def main():
         srid=args.srid,
         geom_type=args.geom_type,
         spatialite_extension=args.spatialite_extension,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        jobs=args.jobs,
+        fast=args.fast,
+        index_strategy=args.index_strategy,
+        progress=args.progress,
+        stats=args.stats,
+        spatial_metadata=args.spatial_metadata,
+        skip_unchanged=args.skip_unchanged,
+        simplify=args.simplify,
+        precision=args.precision,
+        simplified_column=args.simplified_column,
+        source_srid=args.source_srid,
     )
@@ -1,12 +1,56 @@
 import argparse
+import collections
+import contextlib
 import copy
+import datetime
 import fnmatch
+import functools
+import hashlib
+import itertools
+import json
+import multiprocessing
 import os
+import queue
 import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
 
+from shapely import wkb
 from shapely.geometry import shape
 from sqlite_utils import Database
-from sqlite_utils.db import COLUMN_TYPE_MAPPING
+from sqlite_utils.db import COLUMN_TYPE_MAPPING, jsonify_if_needed
+
+try:
+    import numpy
+    from shapely import (
+        GeometryType,
+        from_ragged_array,
+        from_wkb,
+        set_precision,
+        simplify,
+        to_wkb,
+    )
+    from shapely.errors import ShapelyError
+except ImportError:  # Shapely 1.x
+    from_ragged_array = None
+    set_precision = None
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
 
 EXT_NAMES = (
     "mod_spatialite",  # linux
@@ -26,7 +70,64 @@ GEOM_TYPES = (
     "GEOMETRY",
 )
 
-WRITE_MODES = ("replace", "append")
+WRITE_MODES = ("replace", "append", "upsert", "sync")
+
+# write modes which match input features to existing rows by primary key
+UPSERT_MODES = ("upsert", "sync")
+
+INDEX_STRATEGIES = ("incremental", "rebuild")
+
+INFER_TYPES = ("sample", "full")
+
+# source_srid which reads the SRID from a file's metadata, like a shapefile's .prj
+SOURCE_SRID_FROM_PRJ = "prj"
+
+# JSON decoders which can be chosen, if they are installed
+JSON_DECODERS = ("orjson", "msgspec", "json")
+
+# "full" fills spatial_ref_sys with every SRID SpatiaLite knows about.
+# "minimal" starts it empty and adds each SRID the first time it is used.
+SPATIAL_METADATA = ("full", "minimal")
+
+# SRIDs for "undefined" coordinates, which aren't EPSG codes
+UNDEFINED_SRIDS = (-1, 0)
+
+# depth of nested arrays between a GeoJSON geometry's coordinates
+# array and its individual positions
+GEOJSON_NESTING = {
+    "Point": 0,
+    "MultiPoint": 1,
+    "LineString": 1,
+    "MultiLineString": 2,
+    "Polygon": 2,
+    "MultiPolygon": 3,
+}
+
+DEFAULT_BATCH_SIZE = 1000
+
+# batches of records each file's worker process can make ahead
+# of the connection writing them when importing files in parallel
+FILE_RECORDS_QUEUE_SIZE = 2
+
+# values of these types are passed straight to sqlite3 when inserting,
+# anything else goes through sqlite-utils' conversions first
+SQL_TYPES = frozenset((str, int, float, bytes, bool))
+
+# table recording the files imported with skip_unchanged
+MANIFEST_TABLE = "import_manifest"
+# the path which reads an input from stdin instead of a file
+STDIN = "-"
+
+# Settings used while bulk loading with fast=True. These trade durability for
+# speed: if the process or machine crashes mid-import, the database may be
+# left corrupt. See https://www.sqlite.org/pragma.html
+BULK_LOAD_PRAGMAS = {
+    "journal_mode": "MEMORY",
+    "synchronous": "OFF",
+    "cache_size": -262144,  # 256MiB
+    "temp_store": "MEMORY",
+    "mmap_size": 268435456,  # 256MiB
+}
 
 
 class DataImportError(Exception):
@@ -71,12 +172,228 @@ def files_from_paths(paths, pattern):
     return files
 
 
+def positive_int(name, value):
+    if not isinstance(value, int):
+        raise TypeError(f"'{name}' must be an int")
+    if value < 1:
+        raise ValueError(f"{name} must be at least 1")
+    return value
+
+
+def positive_number(name, value):
+    if value is None:
+        return value
+    if not isinstance(value, (int, float)) or isinstance(value, bool):
+        raise TypeError(f"'{name}' must be a number")
+    if value <= 0:
+        raise ValueError(f"{name} must be greater than 0")
+    return value
+
+
 def filename_to_table_name(path):
     _, filename = os.path.split(path)
     table_name, _ = os.path.splitext(filename)
     return table_name
 
 
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+@contextlib.contextmanager
+def worker_pool(workers):
+    """Start a pool of worker processes, or yield None for a single worker
+
+    With the "fork" start method, every worker process is forked by the
+    first task submitted to the pool. One is submitted here, so that they
+    are forked before any other threads are started. Forking a process
+    while another thread is running can leave it deadlocked.
+    """
+    if workers == 1:
+        yield None
+        return
+    with ProcessPoolExecutor(workers) as pool:
+        pool.submit(int)
+        yield pool
+
+
+def map_batches(function, batches, pool, workers):
+    """Apply function to each batch, spread over a pool of worker processes
+
+    Results are yielded in input order. At most two batches per worker
+    are submitted ahead of the caller, so the input is never read into
+    memory faster than results are consumed. If pool is None, each batch
+    is processed by the caller.
+    """
+    if pool is None:
+        yield from map(function, batches)
+        return
+
+    pending = collections.deque()
+    try:
+        for batch in batches:
+            pending.append(pool.submit(function, batch))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def prefetch(iterable):
+    """Consume an iterable in a background thread, one item ahead of the caller
+
+    This allows the next batch of records to be made while
+    the previous one is being written to the database.
+    """
+    items = queue.Queue(maxsize=1)
+    done = object()
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+            put((done, None))
+        except BaseException as e:
+            put((done, e))
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, error = items.get()
+            if item is done:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+def geometry_to_shape(geometry):
+    if not geometry:
+        return None
+    if isinstance(geometry, bytes):
+        return wkb.loads(geometry)
+    return shape(geometry)
+
+
+def flatten_coordinates(coordinates, depth, coords, offsets):
+    if not coordinates and depth < len(offsets):
+        # from_ragged_array can crash on empty parts, like a polygon
+        # with no rings inside a MultiPolygon, so leave them to shape()
+        raise ValueError("geometries with empty parts are converted one at a time")
+    if depth == 1:
+        coords.extend(coordinates)
+        offsets[0].append(len(coords))
+        return
+    for part in coordinates:
+        flatten_coordinates(part, depth - 1, coords, offsets)
+    offsets[depth - 1].append(len(offsets[depth - 2]) - 1)
+
+
+def ragged_geometries(geom_type, geometries):
+    depth = GEOJSON_NESTING[geom_type]
+    if depth == 0:
+        coords = [geometry["coordinates"] for geometry in geometries]
+        offsets = []
+    else:
+        coords = []
+        offsets = [[0] for _ in range(depth)]
+        for geometry in geometries:
+            flatten_coordinates(geometry["coordinates"], depth, coords, offsets)
+
+    coords = numpy.array(coords, dtype="float64")
+    if coords.ndim != 2 or coords.shape[1] not in (2, 3):
+        raise ValueError("coordinates must all have the same dimension")
+
+    return from_ragged_array(
+        GeometryType[geom_type.upper()],
+        coords,
+        tuple(numpy.array(o) for o in offsets) or None,
+    )
+
+
+def geometries_to_shapes(geometries):
+    """Convert a batch of GeoJSON-like geometries to Shapely geometries
+
+    With Shapely 2, geometries are grouped by type and each group
+    is converted in a single call using ragged coordinate arrays,
+    and a numpy array is returned. Anything that can't be converted
+    that way (GeometryCollections, invalid geometries, or all
+    geometries on Shapely 1.x) is converted one at a time instead.
+    Geometries may also be WKB, which is parsed in a single call.
+    """
+    if from_ragged_array is None:
+        return [geometry_to_shape(geometry) for geometry in geometries]
+
+    groups = {}
+    for i, geometry in enumerate(geometries):
+        if isinstance(geometry, bytes):
+            groups.setdefault("WKB", []).append(i)
+        elif geometry:
+            groups.setdefault(geometry["type"], []).append(i)
+
+    shapes = numpy.full(len(geometries), None, dtype=object)
+    for geom_type, indexes in groups.items():
+        group = [geometries[i] for i in indexes]
+        try:
+            if geom_type == "WKB":
+                converted = from_wkb(group)
+            else:
+                converted = ragged_geometries(geom_type, group)
+        except (KeyError, TypeError, ValueError, ShapelyError):
+            converted = [geometry_to_shape(geometry) for geometry in group]
+        for i, geometry in zip(indexes, converted):
+            shapes[i] = geometry
+
+    return shapes
+
+
+def simplify_shapes(shapes, tolerance):
+    # topology is preserved, so polygons never collapse or self-intersect
+    if from_ragged_array is None:
+        return [s if s is None else s.simplify(tolerance) for s in shapes]
+    return simplify(shapes, tolerance, preserve_topology=True)
+
+
+def shapes_to_wkb(shapes):
+    if from_ragged_array is None:
+        return [s if s is None else s.wkb for s in shapes]
+    return to_wkb(shapes).tolist()
+
+
+def geometries_to_wkb(geometries):
+    """Convert a batch of GeoJSON-like geometries to WKB
+
+    A batch which is already WKB, like geometries read from
+    a shapefile, is returned without being parsed at all.
+    """
+    if all(geometry is None or isinstance(geometry, bytes) for geometry in geometries):
+        return list(geometries)
+    return shapes_to_wkb(geometries_to_shapes(geometries))
+
+
 def enable_spatialite_extension(conn, extension):
     if extension:
         conn.load_extension(extension)
@@ -94,47 +411,356 @@ def enable_spatialite_extension(conn, extension):
     )
 
 
-def create_connection(sqlite_db, extension):
-    conn = sqlite3.connect(sqlite_db)
-    conn.enable_load_extension(True)
-    enable_spatialite_extension(conn, extension)
+def init_spatialite(db, extension, spatial_metadata="full"):
+    """Make sure SpatiaLite is loaded and initialised on an open Database
+
+    The extension is only loaded if it isn't already available
+    on the connection, so this is cheap to call more than once.
+    """
+    if spatial_metadata not in SPATIAL_METADATA:
+        raise ValueError(f"spatial_metadata must be one of {str(SPATIAL_METADATA)}")
+
+    conn = db.conn
+    try:
+        conn.execute("SELECT spatialite_version();")
+    except sqlite3.OperationalError:
+        conn.enable_load_extension(True)
+        enable_spatialite_extension(conn, extension)
     try:
         conn.execute("SELECT srid FROM spatial_ref_sys LIMIT 1;")
     except sqlite3.OperationalError:
-        conn.execute("SELECT InitSpatialMetadata(1);")
-    return Database(conn)
+        if spatial_metadata == "minimal":
+            conn.execute("SELECT InitSpatialMetadata(1, 'NONE');")
+        else:
+            conn.execute("SELECT InitSpatialMetadata(1);")
+
+
+def create_connection(sqlite_db, extension, spatial_metadata="full"):
+    db = Database(sqlite3.connect(sqlite_db))
+    init_spatialite(db, extension, spatial_metadata)
+    return db
+
+
+@contextlib.contextmanager
+def spatialite_database(sqlite_db, extension, spatial_metadata="full"):
+    """Yield a SpatiaLite Database for a file name or an existing Database
+
+    A connection opened from a file name is closed afterwards.
+    An existing Database is left open for the caller to reuse.
+    """
+    if isinstance(sqlite_db, Database):
+        init_spatialite(sqlite_db, extension, spatial_metadata)
+        yield sqlite_db
+        return
+
+    db = create_connection(sqlite_db, extension, spatial_metadata)
+    try:
+        yield db
+    finally:
+        db.conn.close()
+
+
+@contextlib.contextmanager
+def bulk_load_pragmas(conn):
+    """Apply BULK_LOAD_PRAGMAS for the duration of an import
+
+    The connection's original settings are restored afterwards.
+    """
+    # the pragmas can't be changed inside a transaction, and
+    # committing the caller's transaction for them isn't ours to do
+    if conn.in_transaction:
+        raise DataImportError(
+            "fast can't be used while the database has a transaction open"
+        )
+    pragmas = dict(BULK_LOAD_PRAGMAS)
+    original = {name: conn.execute(f"PRAGMA {name};").fetchone()[0] for name in pragmas}
+    # WAL is already well suited to bulk loading, and can't be
+    # switched out of while other connections are using the database
+    if original["journal_mode"] == "wal":
+        del pragmas["journal_mode"]
+
+    for name, value in pragmas.items():
+        conn.execute(f"PRAGMA {name} = {value};")
+    try:
+        yield
+    finally:
+        conn.commit()
+        for name in pragmas:
+            conn.execute(f"PRAGMA {name} = {original[name]};")
+
+
+class UncommittedConnection:
+    """A connection which can't be committed by its context manager
+
+    sqlite-utils wraps most of its writes in ``with conn:``, which
+    commits. Inside ``transaction`` they are kept in the open
+    transaction instead.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        return False
+
+
+@contextlib.contextmanager
+def transaction(db):
+    """Make everything written to ``db`` inside the block a single transaction
+
+    The block is committed if it succeeds and rolled back if it raises,
+    so a failed import leaves the database as it was. It is a savepoint,
+    so if the caller already has a transaction open, the block is nested
+    in it. Their pending changes are then neither committed nor rolled
+    back, and the import is only committed when they commit.
+    """
+    conn = db.conn
+    conn.execute("SAVEPOINT geometry_to_spatialite;")
+    db.conn = UncommittedConnection(conn)
+    try:
+        yield
+    except BaseException:
+        conn.execute("ROLLBACK TO geometry_to_spatialite;")
+        raise
+    finally:
+        db.conn = conn
+        conn.execute("RELEASE geometry_to_spatialite;")
+
+
+def msgspec_loads(data):
+    # msgspec's errors aren't ValueErrors, unlike the other decoders'
+    try:
+        return msgspec.json.decode(data)
+    except msgspec.DecodeError as e:
+        raise ValueError(str(e)) from e
+
+
+def json_decoders():
+    """Return the JSON decoders which are installed, fastest first
+
+    Each decoder is a function which takes a JSON document as bytes or str,
+    and raises ``ValueError`` if it isn't valid JSON.
+    """
+    decoders = {}
+    if orjson is not None:
+        decoders["orjson"] = orjson.loads
+    if msgspec is not None:
+        decoders["msgspec"] = msgspec_loads
+    decoders["json"] = json.loads
+    return decoders
+
+
+def find_json_decoder(name=None):
+    """Return the JSON decoder called ``name``, or the fastest one installed
+
+    Raises ``ValueError`` if ``name`` isn't one of ``JSON_DECODERS``
+    or isn't installed.
+    """
+    decoders = json_decoders()
+    if name is None:
+        return next(iter(decoders.values()))
+    if name not in JSON_DECODERS:
+        raise ValueError(f"json_decoder must be one of {str(JSON_DECODERS)}")
+    if name not in decoders:
+        raise ValueError(f"JSON decoder '{name}' is not installed")
+    return decoders[name]
+
+
+def sql_value(value):
+    if value is None or type(value) in SQL_TYPES:
+        return value
+    return jsonify_if_needed(value)
 
 
 def escape(name):
     return name.replace('"', '""')
 
 
-def table_is_compatible(conn, table, columns, geom_type):
+def table_is_compatible(
+    conn, table, columns, geom_type, geometry_columns=("geometry",)
+):
     table_info = conn.execute(f'PRAGMA table_info("{escape(table)}");').fetchall()
 
     input_cols = copy.deepcopy(columns)
     for colname in input_cols:
         input_cols[colname] = COLUMN_TYPE_MAPPING[input_cols[colname]]
-    input_cols["geometry"] = geom_type
+    for column in geometry_columns:
+        input_cols[column] = geom_type
 
     table_cols = {col[1]: col[2] for col in table_info}
 
     return table_cols == input_cols
 
 
+def peak_rss():
+    """Return the most memory this process has used so far, in bytes"""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kibibytes everywhere else
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+class FeatureSource:
+    """An iterable of features which knows how much of its input has been read
+
+    ``position`` is a function returning the number of bytes read so far.
+    Once the input has been closed it raises ``ValueError``, and the whole
+    input counts as read.
+    """
+
+    def __init__(self, features, position, size):
+        self.features = features
+        self.position = position
+        self.size = size
+
+    def __iter__(self):
+        return iter(self.features)
+
+    @property
+    def bytes_read(self):
+        try:
+            return min(self.position(), self.size)
+        except ValueError:
+            return self.size
+
+
+class ImportStats:
+    """Progress and timings for importing one file into one table
+
+    Stage times are the total wall time spent reading features, making
+    records from them, inserting the records and maintaining the spatial
+    index. Stages run at the same time as each other when features are
+    read in the background or in worker processes, so they can add up to
+    more than the elapsed time.
+    """
+
+    STAGES = ("read", "records", "insert", "index")
+
+    def __init__(self, table_name, source=None):
+        self.table_name = table_name
+        self.source = source
+        self.features = 0
+        self.stages = dict.fromkeys(self.STAGES, 0.0)
+        self.started = time.perf_counter()
+        self.ended = None
+
+    @property
+    def done(self):
+        return self.ended is not None
+
+    @property
+    def elapsed(self):
+        end = self.ended if self.done else time.perf_counter()
+        return end - self.started
+
+    @property
+    def features_per_sec(self):
+        elapsed = self.elapsed
+        return self.features / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def bytes_read(self):
+        return getattr(self.source, "bytes_read", None)
+
+    def add(self, stage, seconds):
+        self.stages[stage] += seconds
+
+    @contextlib.contextmanager
+    def timing(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+
+    def timed(self, stage, iterable):
+        """Yield from iterable, adding the time spent waiting for each item to stage"""
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            self.add(stage, time.perf_counter() - start)
+            yield item
+
+    def collect(self, stage, results):
+        """Yield the items from (item, seconds) pairs, adding the seconds to stage"""
+        for item, seconds in results:
+            self.add(stage, seconds)
+            yield item
+
+    def end(self):
+        self.ended = time.perf_counter()
+
+    def as_dict(self):
+        return {
+            "table": self.table_name,
+            "features": self.features,
+            "bytes_read": self.bytes_read,
+            "elapsed": self.elapsed,
+            "features_per_sec": self.features_per_sec,
+            "stages": dict(self.stages),
+            "peak_rss": peak_rss(),
+        }
+
+
+def format_progress(stats):
+    """Return a one line summary of an import's progress"""
+    parts = [f"{stats.table_name}: {stats.features:,} features"]
+    if stats.bytes_read is not None:
+        parts.append(f"{stats.bytes_read / 1024 ** 2:,.1f} MB read")
+    parts.append(f"{stats.features_per_sec:,.0f} features/sec")
+    if stats.done:
+        parts.append(f"done in {stats.elapsed:.1f}s")
+    return ", ".join(parts)
+
+
 class GeometryTable:
-    def __init__(self, db, table_name, srid, geom_type):
+    def __init__(
+        self,
+        db,
+        table_name,
+        srid,
+        geom_type,
+        geometry_columns=("geometry",),
+        source_srid=None,
+        spatial_metadata="full",
+    ):
         self.db = db
         self.table = table_name
         self.name = self.table.name
         self.srid = srid
+        self.source_srid = srid if source_srid is None else source_srid
         self.geom_type = geom_type
-
-    def __enter__(self):
-        return self
-
-    def __exit__(self, exc_type, exc_value, exc_traceback):
-        self.db.conn.commit()
+        self.geometry_columns = geometry_columns
+        self.spatial_metadata = spatial_metadata
+        self.columns = None
+        self.failed_reprojections = 0
+
+        # geometries are inserted as WKB, and reprojected by
+        # SpatiaLite if they aren't already in the table's SRID
+        value = f"ST_GeomFromWKB(?, {self.source_srid})"
+        if self.source_srid != self.srid:
+            # ST_Transform returns NULL when it fails, which would store
+            # a NULL geometry without any error, so failures are counted
+            db.conn.create_function(
+                "gts_reprojection_failed", 0, self.reprojection_failed
+            )
+            value = (
+                "(SELECT CASE WHEN g IS NULL THEN NULL ELSE "
+                f"COALESCE(ST_Transform(g, {self.srid}), gts_reprojection_failed()) "
+                f"END FROM (SELECT {value} AS g))"
+            )
+        self.conversions = {column: value for column in geometry_columns}
 
     @property
     def table(self):
@@ -144,37 +770,206 @@ class GeometryTable:
     def table(self, table_name):
         self._table = self.db[table_name]
 
+    def add_srid(self, srid):
+        # with minimal metadata, spatial_ref_sys only has
+        # the SRIDs which have been used in this database
+        if self.spatial_metadata != "minimal" or srid in UNDEFINED_SRIDS:
+            return
+        conn = self.db.conn
+        if conn.execute(
+            "SELECT 1 FROM spatial_ref_sys WHERE srid = ?;", [srid]
+        ).fetchone():
+            return
+        if not conn.execute("SELECT InsertEpsgSrid(?);", [srid]).fetchone()[0]:
+            raise DataImportError(f"SRID {srid} is not a known EPSG code")
+
+    def reprojection_failed(self):
+        self.failed_reprojections += 1
+        return None
+
+    def check_reprojections(self):
+        if self.failed_reprojections:
+            raise DataImportError(
+                f"{self.failed_reprojections} geometries couldn't be reprojected "
+                f"from SRID {self.source_srid} to SRID {self.srid}"
+            )
+
     def create_table(self, columns, pk):
+        self.add_srid(self.srid)
         self.table.create(columns, pk=pk)
-        self.db.conn.execute(
-            "SELECT AddGeometryColumn(?, 'geometry', ?, ?, 2);",
-            [self.table.name, self.srid, self.geom_type],
-        )
+        for column in self.geometry_columns:
+            self.db.conn.execute(
+                "SELECT AddGeometryColumn(?, ?, ?, ?, 2);",
+                [self.table.name, column, self.srid, self.geom_type],
+            )
+
+    @property
+    def index_name(self):
+        return f"idx_{self.table.name}_geometry"
+
+    def has_spatial_index(self):
+        indexes = self.db.conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name=?;",
+            [self.index_name],
+        ).fetchall()
+        return len(indexes) > 0
 
     def create_spatial_index(self):
         self.db.conn.execute(
             "SELECT CreateSpatialIndex(?, 'geometry');", [self.table.name]
         )
 
+    def drop_spatial_index(self):
+        # removes the triggers which keep the R*Tree up to date on every
+        # insert. The index is built again in one go by create_spatial_index
+        self.db.conn.execute(
+            "SELECT DisableSpatialIndex(?, 'geometry');", [self.table.name]
+        )
+        self.db.conn.execute(f'DROP TABLE "{escape(self.index_name)}";')
+
     def insert_all(self, records, **kwargs):
         self.table.insert_all(records, **kwargs)
 
+    def insert(self, records, **kwargs):
+        """Insert records using one prepared statement for the whole table
+
+        The statement is only built again when the table's columns change.
+        If any record has a key which isn't a column yet, the batch goes
+        through sqlite-utils' insert_all with kwargs instead, so that the
+        missing columns can be added.
+        """
+        if self.columns is None:
+            self.columns = [column.name for column in self.table.columns]
+            names = ", ".join(f'"{escape(c)}"' for c in self.columns)
+            values = ", ".join(self.conversions.get(c, "?") for c in self.columns)
+            self.insert_sql = (
+                f'INSERT INTO "{escape(self.name)}" ({names}) VALUES ({values});'
+            )
+
+        known = set(self.columns)
+        if not all(known.issuperset(record) for record in records):
+            self.insert_all(records, **kwargs)
+            self.columns = None
+            return
+
+        columns = self.columns
+        self.db.conn.executemany(
+            self.insert_sql,
+            (tuple(map(sql_value, map(record.get, columns))) for record in records),
+        )
+
+    def upsert_all(self, records, pk_keys):
+        """Insert records, updating existing rows with the same primary key
+
+        An existing row is only updated if one of its values has changed,
+        so unchanged rows are never rewritten and their spatial index
+        entries are left alone.
+        """
+        self.table.add_missing_columns(records)
+        columns = [column.name for column in self.table.columns]
+        names = ", ".join(f'"{escape(c)}"' for c in columns)
+        values = ", ".join(self.conversions.get(c, "?") for c in columns)
+        keys = ", ".join(f'"{escape(c)}"' for c in pk_keys)
+        others = [c for c in columns if c not in pk_keys]
+        update = ", ".join(f'"{escape(c)}" = excluded."{escape(c)}"' for c in others)
+        changed = " OR ".join(
+            f'"{escape(self.name)}"."{escape(c)}" IS NOT excluded."{escape(c)}"'
+            for c in others
+        )
+        self.db.conn.executemany(
+            f'INSERT INTO "{escape(self.name)}" ({names}) VALUES ({values}) '
+            f"ON CONFLICT ({keys}) DO UPDATE SET {update} WHERE {changed};",
+            (tuple(map(sql_value, map(record.get, columns))) for record in records),
+        )
+
+    def start_sync(self, pk_keys):
+        # keys seen in the input are kept in a temporary table, so rows
+        # with any other key can be deleted once the import is done
+        keys = ", ".join(f'"{escape(c)}"' for c in pk_keys)
+        self.db.conn.execute("DROP TABLE IF EXISTS temp.sync_keys;")
+        self.db.conn.execute(
+            f"CREATE TEMP TABLE sync_keys ({keys}, PRIMARY KEY ({keys}));"
+        )
+
+    def add_sync_keys(self, records, pk_keys):
+        placeholders = ", ".join("?" for _ in pk_keys)
+        self.db.conn.executemany(
+            f"INSERT OR IGNORE INTO temp.sync_keys VALUES ({placeholders});",
+            (tuple(map(sql_value, map(record.get, pk_keys))) for record in records),
+        )
+
+    def delete_unsynced(self, pk_keys):
+        matches = " AND ".join(
+            f'k."{escape(c)}" IS "{escape(self.name)}"."{escape(c)}"' for c in pk_keys
+        )
+        self.db.conn.execute(
+            f'DELETE FROM "{escape(self.name)}" WHERE NOT EXISTS '
+            f"(SELECT 1 FROM temp.sync_keys AS k WHERE {matches});"
+        )
+        self.db.conn.execute("DROP TABLE temp.sync_keys;")
+
 
 class FeatureLoader:
     def __init__(
-        self, db, features, table_name, srid, pk, columns, write_mode, geom_type
+        self,
+        db,
+        features,
+        table_name,
+        srid,
+        pk,
+        columns,
+        write_mode,
+        geom_type,
+        batch_size=DEFAULT_BATCH_SIZE,
+        workers=1,
+        fast=False,
+        index_strategy="incremental",
+        observer=None,
+        simplify=None,
+        precision=None,
+        simplified_column=None,
+        source_srid=None,
+        decode=None,
+        spatial_metadata="full",
     ):
         self.db = db
         if not isinstance(srid, int):
             raise TypeError("'srid' must be an int")
+        if source_srid is not None and not isinstance(source_srid, int):
+            raise TypeError("'source_srid' must be an int")
         self.srid = srid
+        self.source_srid = source_srid
         self.features = features
         self.pk = pk
         self.table_name = table_name
+        self.simplify = simplify
+        self.precision = precision
+        self.simplified_column = simplified_column
         self.columns = columns
-        self.columns.pop("geometry", None)
+        for column in self.geometry_columns:
+            self.columns.pop(column, None)
         self.geom_type = geom_type
         self.write_mode = write_mode
+        self.batch_size = batch_size
+        self.workers = workers
+        self.fast = fast
+        self.index_strategy = index_strategy
+        self.observer = observer
+        # turns each batch read from the input into features. It runs with
+        # make_records, so with workers > 1 the input is parsed in parallel
+        self.decode = decode
+        self.spatial_metadata = spatial_metadata
+        self.stats = None
+
+    def __getstate__(self):
+        # when records are made in worker processes, only
+        # the settings needed to make them are sent over
+        state = self.__dict__.copy()
+        del state["db"]
+        del state["features"]
+        del state["observer"]
+        del state["stats"]
+        return state
 
     @property
     def geom_type(self):
@@ -195,8 +990,72 @@ class FeatureLoader:
         allowed_values = (None,) + WRITE_MODES
         if write_mode not in allowed_values:
             raise ValueError(f"write_mode must be one of {str(allowed_values)}")
+        if write_mode in UPSERT_MODES and self.pk is None:
+            raise ValueError(f"write_mode '{write_mode}' needs a pk")
         self._write_mode = write_mode
 
+    @property
+    def index_strategy(self):
+        return self._index_strategy
+
+    @index_strategy.setter
+    def index_strategy(self, index_strategy):
+        if index_strategy not in INDEX_STRATEGIES:
+            raise ValueError(f"index_strategy must be one of {str(INDEX_STRATEGIES)}")
+        self._index_strategy = index_strategy
+
+    @property
+    def simplify(self):
+        return self._simplify
+
+    @simplify.setter
+    def simplify(self, simplify):
+        self._simplify = positive_number("simplify", simplify)
+
+    @property
+    def precision(self):
+        return self._precision
+
+    @precision.setter
+    def precision(self, precision):
+        if precision is not None and set_precision is None:
+            raise ValueError("precision needs Shapely 2 or later")
+        self._precision = positive_number("precision", precision)
+
+    @property
+    def simplified_column(self):
+        return self._simplified_column
+
+    @simplified_column.setter
+    def simplified_column(self, simplified_column):
+        if simplified_column is not None and self.simplify is None:
+            raise ValueError("simplified_column needs a simplify tolerance")
+        if simplified_column == "geometry":
+            raise ValueError("simplified_column can't be 'geometry'")
+        self._simplified_column = simplified_column
+
+    @property
+    def geometry_columns(self):
+        if self.simplified_column is None:
+            return ("geometry",)
+        return ("geometry", self.simplified_column)
+
+    @property
+    def batch_size(self):
+        return self._batch_size
+
+    @batch_size.setter
+    def batch_size(self, batch_size):
+        self._batch_size = positive_int("batch_size", batch_size)
+
+    @property
+    def workers(self):
+        return self._workers
+
+    @workers.setter
+    def workers(self, workers):
+        self._workers = positive_int("workers", workers)
+
     @property
     def pk(self):
         return self._pk
@@ -217,51 +1076,175 @@ class FeatureLoader:
         else:
             raise TypeError("pk must be a string, a list, or a tuple")
 
-        if isinstance(self._pk, str):
-            keys = [self._pk]
-        else:
-            keys = self._pk
+        return
 
-        for feature in self.features:
-            for key in keys:
-                if key not in feature["properties"]:
-                    raise DataImportError(
-                        f"Field '{pk}' must exist in every feature to be used as Primary Key"
-                    )
+    @property
+    def pk_keys(self):
+        if self.pk is None:
+            return ()
+        if isinstance(self.pk, str):
+            return (self.pk,)
+        return self.pk
+
+    def make_record(self, feature, geometry, simplified=None):
+        # each feature is only used once, to make its record, so its
+        # properties dict is reused as the record instead of being copied
+        record = feature["properties"]
+        if record is None:
+            record = {}
+        if "id" in feature:
+            record["id"] = feature["id"]
+
+        # features may be streamed from the input file, so we check the
+        # primary key as each record is made instead of scanning them up-front.
+        # duplicate keys are caught by the table's primary key index. SQLite
+        # treats nulls as distinct there, so upsert and sync could never
+        # match a key with a null part. Other modes only reject a null key
+        null_parts = 0
+        for key in self.pk_keys:
+            if key not in record:
+                raise DataImportError(
+                    f"Field '{self.pk}' must exist in every feature to be used as Primary Key"
+                )
+            if record[key] is None:
+                null_parts += 1
+        if null_parts and (
+            self.write_mode in UPSERT_MODES or null_parts == len(self.pk_keys)
+        ):
+            raise DataImportError(
+                f"Field '{self.pk}' must not be null to be used as Primary Key"
+            )
 
-        return
+        record["geometry"] = geometry
+        if self.simplified_column is not None:
+            record[self.simplified_column] = simplified
+        return record
 
-    def make_record(self, feature):
-        record = copy.deepcopy(feature["properties"])
+    def make_records(self, features):
+        if self.decode is not None:
+            features = self.decode(features)
+        geometries = [feature["geometry"] for feature in features]
+
+        # WKB is smaller and much cheaper to write and for SpatiaLite
+        # to parse than WKT, with no loss of coordinate precision
+        if self.simplify is None and self.precision is None:
+            return [
+                self.make_record(feature, geometry)
+                for feature, geometry in zip(features, geometries_to_wkb(geometries))
+            ]
+
+        shapes = geometries_to_shapes(geometries)
+        if self.precision is not None:
+            shapes = set_precision(shapes, self.precision)
+
+        if self.simplify is None:
+            geometries = shapes_to_wkb(shapes)
+            simplified = itertools.repeat(None)
+        elif self.simplified_column is None:
+            geometries = shapes_to_wkb(simplify_shapes(shapes, self.simplify))
+            simplified = itertools.repeat(None)
+        else:
+            geometries = shapes_to_wkb(shapes)
+            simplified = shapes_to_wkb(simplify_shapes(shapes, self.simplify))
 
-        record["geometry"] = None
-        if feature["geometry"]:
-            record["geometry"] = shape(feature["geometry"]).wkt
+        return [
+            self.make_record(feature, geometry, simplified_geometry)
+            for feature, geometry, simplified_geometry in zip(
+                features, geometries, simplified
+            )
+        ]
 
-        return record
+    def make_timed_records(self, features):
+        # the time is sent back with the records so that it
+        # can be counted when they are made in a worker process
+        start = time.perf_counter()
+        records = self.make_records(features)
+        return records, time.perf_counter() - start
+
+    def notify(self, stats):
+        if self.observer is not None:
+            self.observer(stats)
 
     def load(self):
-        # parse the input file for data to insert
-        records = []
-        for feature in self.features:
-            records.append(self.make_record(feature))
-
-        with GeometryTable(
-            self.db, self.table_name, self.srid, self.geom_type
-        ) as table:
+        # features may be any iterable, so we parse the input in fixed-size
+        # batches to keep memory use proportional to the batch size
+        stats = ImportStats(self.table_name, self.features)
+        # write() makes records in a background thread, so
+        # the pool is started in this thread before it runs
+        with worker_pool(self.workers) as pool:
+            batches = map_batches(
+                self.make_timed_records,
+                stats.timed("read", batched(self.features, self.batch_size)),
+                pool,
+                self.workers,
+            )
+            self.write(stats.collect("records", batches), stats)
+
+    def insert(self, table, records):
+        try:
+            table.insert(
+                records,
+                alter=True,
+                pk=self.pk,
+                batch_size=self.batch_size,
+                conversions=table.conversions,
+            )
+        except sqlite3.IntegrityError as e:
+            # other constraints, like the geometry type, are left as they are
+            if self.pk is None or "UNIQUE constraint failed" not in str(e):
+                raise
+            raise DataImportError(
+                f"Field '{self.pk}' must be unique to be used as Primary Key, "
+                "but a feature has the same key as another feature or an "
+                f"existing row ({e})"
+            ) from e
+
+    def write(self, batches, stats=None):
+        if stats is None:
+            stats = ImportStats(self.table_name)
+        self.stats = stats
+
+        if self.fast:
+            pragmas = bulk_load_pragmas(self.db.conn)
+        else:
+            pragmas = contextlib.nullcontext()
+
+        # nothing is committed unless every feature is written, so a bad
+        # feature can't leave a partly imported or partly replaced table
+        with pragmas, transaction(self.db):
+            table = GeometryTable(
+                self.db,
+                self.table_name,
+                self.srid,
+                self.geom_type,
+                self.geometry_columns,
+                self.source_srid,
+                self.spatial_metadata,
+            )
             if self.table_name in self.db.table_names():
                 if self.write_mode == "replace":
                     self.db.conn.execute(
                         f'SELECT DropGeoTable("{escape(self.table_name)}")'
                     )
-                elif self.write_mode == "append":
+                elif self.write_mode in ("append",) + UPSERT_MODES:
                     if not table_is_compatible(
-                        self.db.conn, table.name, self.columns, self.geom_type
+                        self.db.conn,
+                        table.name,
+                        self.columns,
+                        self.geom_type,
+                        self.geometry_columns,
                     ):
                         raise DataImportError(
                             "Input file must have same column structure as target "
                             "table to append to an existing table."
                         )
+                    if self.write_mode in UPSERT_MODES and table.table.pks != list(
+                        self.pk_keys
+                    ):
+                        raise DataImportError(
+                            f"Table '{self.table_name}' must have {self.pk} as "
+                            f"its primary key to use write_mode '{self.write_mode}'."
+                        )
                 else:
                     raise DataImportError(
                         f"Table '{self.table_name}' already exists. Use "
@@ -270,26 +1253,200 @@ class FeatureLoader:
 
             if self.table_name not in self.db.table_names():
                 table.create_table(self.columns, self.pk)
+            elif self.index_strategy == "rebuild" and table.has_spatial_index():
+                with stats.timing("index"):
+                    table.drop_spatial_index()
+
+            if table.source_srid != table.srid:
+                table.add_srid(table.source_srid)
+
+            if self.write_mode == "sync":
+                table.start_sync(self.pk_keys)
+
+            for records in prefetch(batches):
+                with stats.timing("insert"):
+                    if self.write_mode in UPSERT_MODES:
+                        table.upsert_all(records, self.pk_keys)
+                    else:
+                        self.insert(table, records)
+                    table.check_reprojections()
+                    if self.write_mode == "sync":
+                        table.add_sync_keys(records, self.pk_keys)
+                stats.features += len(records)
+                self.notify(stats)
+
+            if self.write_mode == "sync":
+                with stats.timing("insert"):
+                    table.delete_unsynced(self.pk_keys)
+
+            with stats.timing("index"):
+                if not table.has_spatial_index():
+                    table.create_spatial_index()
+
+        stats.end()
+        self.notify(stats)
+
+
+def make_file_records(
+    reader,
+    item,
+    *,
+    records_queue,
+    srid,
+    pk,
+    write_mode,
+    geom_type,
+    batch_size,
+    simplify,
+    precision,
+    simplified_column,
+    decode,
+):
+    """Read a file and make its records, without writing anything
+
+    This runs in a worker process when importing several files in
+    parallel. The file's column types, then each batch of records, then
+    ``None`` are put on ``records_queue``, to be written by a single
+    connection in the parent process. The queue is bounded, so only a few
+    batches of each file are held in memory at a time. An exception is put
+    on the queue in place of the rest of the records if anything fails.
+    """
+    try:
+        table_name, filename = item
+        features, columns = reader(filename)
+        loader = FeatureLoader(
+            None,
+            features,
+            table_name,
+            srid,
+            pk,
+            columns,
+            write_mode,
+            geom_type,
+            batch_size=batch_size,
+            simplify=simplify,
+            precision=precision,
+            simplified_column=simplified_column,
+            decode=decode,
+        )
+        records_queue.put(loader.columns)
+        for batch in batched(features, batch_size):
+            records_queue.put(loader.make_records(batch))
+    except Exception as e:
+        records_queue.put(e)
+    else:
+        records_queue.put(None)
 
-            table.insert_all(
-                records,
-                alter=True,
-                pk=self.pk,
-                conversions={"geometry": f"ST_GeomFromText(?, {self.srid})"},
+
+def queued_records(records_queue):
+    """Yield what make_file_records puts on a queue, until the file is done"""
+    while True:
+        item = records_queue.get()
+        if item is None:
+            return
+        if isinstance(item, Exception):
+            raise item
+        yield item
+
+
+class Manifest:
+    """The files imported into a database, used to skip files which haven't changed
+
+    Files are compared by size and modification time first. Their SHA-256
+    hash is only calculated when one of those has changed, so a file which
+    was touched or copied without being modified is still skipped.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.table = db[MANIFEST_TABLE]
+        if not self.table.exists():
+            self.table.create(
+                {
+                    "path": str,
+                    "table_name": str,
+                    "size": int,
+                    "mtime": float,
+                    "sha256": str,
+                    "imported_at": str,
+                },
+                pk="path",
             )
 
-            indexes = self.db.conn.execute(f"""
-                SELECT name FROM sqlite_master WHERE type='table'
-                AND name="idx_{escape(self.table_name)}_geometry";
-                """).fetchall()
-            if len(indexes) == 0:
-                table.create_spatial_index()
+    @staticmethod
+    def sha256(paths):
+        digest = hashlib.sha256()
+        for path in paths:
+            with open(path, "rb") as f:
+                for chunk in iter(functools.partial(f.read, 1024 * 1024), b""):
+                    digest.update(chunk)
+        return digest.hexdigest()
+
+    def check(self, filename, table_name, paths):
+        """Return a manifest entry for filename if it needs importing, or None
+
+        ``paths`` are all the files which make up the input, so
+        a change to a shapefile's .dbf is noticed as well as its .shp.
+        """
+        stats = [os.stat(path) for path in paths]
+        entry = {
+            "path": os.path.abspath(filename),
+            "table_name": table_name,
+            "size": sum(stat.st_size for stat in stats),
+            "mtime": max(stat.st_mtime for stat in stats),
+        }
+        previous = self.db.execute(
+            f'SELECT table_name, size, mtime, sha256 FROM "{MANIFEST_TABLE}" '
+            "WHERE path = ?;",
+            [entry["path"]],
+        ).fetchone()
+        if previous is None or previous[0] != table_name:
+            return dict(entry, sha256=self.sha256(paths))
+        if table_name not in self.db.table_names():
+            return dict(entry, sha256=self.sha256(paths))
+        if previous[1:3] == (entry["size"], entry["mtime"]):
+            return None
+
+        entry["sha256"] = self.sha256(paths)
+        if entry["sha256"] != previous[3]:
+            return entry
+        self.table.update(entry["path"], {"mtime": entry["mtime"]})
+        return None
+
+    def record(self, entry):
+        now = datetime.datetime.now(datetime.timezone.utc)
+        self.table.upsert(dict(entry, imported_at=now.isoformat()), pk="path")
 
 
 class Command:
-    def __init__(self, function, file_type):
+    def __init__(
+        self,
+        function,
+        reader,
+        file_type,
+        infers_types=False,
+        related_extensions=(),
+        guess_srid=None,
+        decode=None,
+        reads_stdin=False,
+        json_decoder_help=None,
+    ):
         self.function = function
+        self.reader = reader
         self.file_type = file_type
+        # whether column types are inferred from the data,
+        # rather than declared in the file like a .dbf's fields
+        self.infers_types = infers_types
+        # other files which are read along with each input file
+        self.related_extensions = related_extensions
+        # finds the SRID of a file's coordinates from
+        # its metadata, like a shapefile's .prj
+        self.guess_srid = guess_srid
+        self.decode = decode
+        # whether a path of "-" reads the input from stdin
+        self.reads_stdin = reads_stdin
+        # files which are JSON get a --json-decoder option, described by this
+        self.json_decoder_help = json_decoder_help
         self.extension = f".{file_type.lower()}"
         self.pattern = f"*.{file_type.lower()}"
 
@@ -304,49 +1461,220 @@ class Command:
         srid,
         geom_type,
         spatialite_extension,
+        batch_size=DEFAULT_BATCH_SIZE,
+        workers=1,
+        jobs=1,
+        fast=False,
+        index_strategy="incremental",
+        progress=False,
+        stats=False,
+        spatial_metadata="full",
+        infer_types="sample",
+        skip_unchanged=False,
+        simplify=None,
+        precision=None,
+        simplified_column=None,
+        source_srid=None,
+        json_decoder=None,
     ):
         if "." not in dbname:
             dbname += ".db"
 
-        files = files_from_paths(paths, self.pattern)
-        if len(files) == 0:
-            raise Exception("failed to match any files")
-
-        if len(paths) == 1 and os.path.isfile(paths[0]):
-            self.function(
-                dbname,
-                paths[0],
-                table_name=table,
-                spatialite_extension=spatialite_extension,
-                srid=srid,
-                pk=primary_key,
-                write_mode=write_mode,
-                geom_type=geom_type,
-            )
-            print(f"Imported {paths[0]} into {dbname}")
+        if self.reads_stdin and paths == [STDIN]:
+            files = {table: STDIN}
         else:
-            for tablename, filename in files.items():
-                self.function(
-                    dbname,
-                    filename,
-                    table_name=tablename,
-                    spatialite_extension=spatialite_extension,
-                    srid=srid,
-                    pk=primary_key,
+            files = files_from_paths(paths, self.pattern)
+            if len(files) == 0:
+                raise Exception("failed to match any files")
+            if len(paths) == 1 and os.path.isfile(paths[0]) and table is not None:
+                files = {table: paths[0]}
+
+        observer = self.make_observer(progress, stats)
+        options = {"infer_types": infer_types} if self.infers_types else {}
+        if self.json_decoder_help is not None:
+            options["json_decoder"] = json_decoder
+
+        # one connection is shared by every file, so the extension is
+        # loaded and the spatial metadata is checked only once
+        with spatialite_database(dbname, spatialite_extension, spatial_metadata) as db:
+            entries = {}
+            if skip_unchanged:
+                manifest = Manifest(db)
+                for tablename, filename in list(files.items()):
+                    entry = manifest.check(
+                        filename, tablename, self.related_files(filename)
+                    )
+                    if entry is None:
+                        print(f"Skipped {filename}, unchanged since it was imported")
+                        del files[tablename]
+                    else:
+                        entries[tablename] = entry
+
+            def imported(tablename, filename):
+                if tablename in entries:
+                    manifest.record(entries[tablename])
+                source = "stdin" if filename == STDIN else filename
+                print(f"Imported {source} into {dbname}")
+
+            if jobs > 1 and len(files) > 1:
+                self.invoke_parallel(
+                    db,
+                    files,
+                    imported,
+                    primary_key=primary_key,
                     write_mode=write_mode,
+                    srid=srid,
                     geom_type=geom_type,
+                    batch_size=batch_size,
+                    jobs=jobs,
+                    fast=fast,
+                    index_strategy=index_strategy,
+                    observer=observer,
+                    options=options,
+                    simplify=simplify,
+                    precision=precision,
+                    simplified_column=simplified_column,
+                    source_srid=source_srid,
+                    spatial_metadata=spatial_metadata,
                 )
-                print(f"Imported {filename} into {dbname}")
+            else:
+                for tablename, filename in files.items():
+                    self.function(
+                        db,
+                        filename,
+                        table_name=tablename,
+                        spatialite_extension=spatialite_extension,
+                        srid=srid,
+                        pk=primary_key,
+                        write_mode=write_mode,
+                        geom_type=geom_type,
+                        batch_size=batch_size,
+                        workers=workers,
+                        fast=fast,
+                        index_strategy=index_strategy,
+                        observer=observer,
+                        simplify=simplify,
+                        precision=precision,
+                        simplified_column=simplified_column,
+                        source_srid=source_srid,
+                        spatial_metadata=spatial_metadata,
+                        **options,
+                    )
+                    imported(tablename, filename)
+
+    def invoke_parallel(
+        self,
+        db,
+        files,
+        imported,
+        *,
+        primary_key,
+        write_mode,
+        srid,
+        geom_type,
+        batch_size,
+        jobs,
+        fast,
+        index_strategy,
+        observer,
+        options,
+        simplify,
+        precision,
+        simplified_column,
+        source_srid,
+        spatial_metadata,
+    ):
+        # files are read and their records made in a pool of worker processes,
+        # but everything is written through this one connection so that
+        # only one process ever writes to the database
+        decode = self.decode
+        if decode is not None and "json_decoder" in options:
+            decode = functools.partial(
+                decode, loads=find_json_decoder(options["json_decoder"])
+            )
+        make_records = functools.partial(
+            make_file_records,
+            functools.partial(self.reader, **options),
+            srid=srid,
+            pk=primary_key,
+            write_mode=write_mode,
+            geom_type=geom_type,
+            batch_size=batch_size,
+            simplify=simplify,
+            precision=precision,
+            simplified_column=simplified_column,
+            decode=decode,
+        )
+        items = list(files.items())
+        # the manager is shut down first if anything fails, so that workers
+        # waiting for room on their queues stop instead of waiting forever
+        with ProcessPoolExecutor(jobs) as pool, multiprocessing.Manager() as manager:
+            queues = [manager.Queue(FILE_RECORDS_QUEUE_SIZE) for _ in items]
+            futures = [
+                pool.submit(make_records, item, records_queue=records_queue)
+                for item, records_queue in zip(items, queues)
+            ]
+            try:
+                for (tablename, filename), records_queue in zip(items, queues):
+                    batches = queued_records(records_queue)
+                    columns = next(batches)
+                    loader = FeatureLoader(
+                        db,
+                        (),
+                        tablename,
+                        srid,
+                        primary_key,
+                        columns,
+                        write_mode,
+                        geom_type,
+                        batch_size=batch_size,
+                        fast=fast,
+                        index_strategy=index_strategy,
+                        observer=observer,
+                        simplify=simplify,
+                        precision=precision,
+                        simplified_column=simplified_column,
+                        source_srid=self.source_srid(db, filename, source_srid),
+                        decode=decode,
+                        spatial_metadata=spatial_metadata,
+                    )
+                    loader.write(batches)
+                    imported(tablename, filename)
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+
+    def source_srid(self, db, filename, source_srid):
+        if source_srid == SOURCE_SRID_FROM_PRJ and self.guess_srid is not None:
+            return self.guess_srid(db, filename)
+        return source_srid
+
+    def related_files(self, filename):
+        base, _ = os.path.splitext(filename)
+        related = [base + extension for extension in self.related_extensions]
+        return [filename] + [path for path in related if os.path.exists(path)]
+
+    def make_observer(self, progress, stats):
+        if not progress and not stats:
+            return None
+
+        def observer(import_stats):
+            if progress:
+                print(format_progress(import_stats), file=sys.stderr)
+            if stats and import_stats.done:
+                print(json.dumps(import_stats.as_dict()), file=sys.stderr)
+
+        return observer
 
     def parse_args(self, args):
         arg_parser = argparse.ArgumentParser(
             description=f"Load {self.file_type} files into a SpatiaLite database"
         )
-        arg_parser.add_argument(
-            "paths",
-            nargs="+",
-            help=f"Paths to individual {self.file_type} files or to directories containing {self.extension} files",
-        )
+        paths_help = f"Paths to individual {self.file_type} files or to directories containing {self.extension} files"
+        if self.reads_stdin:
+            paths_help += f", or {STDIN} to read from stdin"
+        paths_arg = arg_parser.add_argument("paths", nargs="+", help=paths_help)
         dbname_arg = arg_parser.add_argument(
             "dbname", help="Name of the SQLite database file"
         )
@@ -365,7 +1693,11 @@ class Command:
         )
         arg_parser.add_argument(
             "--write-mode",
-            help="Pass 'replace' or 'append' to overwrite or append to an existing table",
+            help=(
+                "Pass 'replace' or 'append' to overwrite or append to an existing "
+                "table. 'upsert' inserts new rows and updates changed rows by primary "
+                "key, and 'sync' also deletes rows which aren't in the input"
+            ),
             default=None,
             choices=WRITE_MODES,
         )
@@ -376,6 +1708,26 @@ class Command:
             type=int,
             default=4326,
         )
+
+        def srid_or_prj(value):
+            if value == SOURCE_SRID_FROM_PRJ and self.guess_srid is not None:
+                return value
+            return int(value)
+
+        arg_parser.add_argument(
+            "--source-srid",
+            help=(
+                "SRID of the input coordinates, if they need reprojecting to --srid"
+                + (
+                    f", or '{SOURCE_SRID_FROM_PRJ}' to read it from the .prj file"
+                    if self.guess_srid is not None
+                    else ""
+                )
+                + ", default=the same as --srid"
+            ),
+            type=srid_or_prj,
+            default=None,
+        )
         arg_parser.add_argument(
             "--geom-type",
             help="Data type to use for the geometry column, default='GEOMETRY'",
@@ -387,6 +1739,114 @@ class Command:
             help="Path to the mod_spatialite extension",
             default=None,
         )
+        arg_parser.add_argument(
+            "--batch-size",
+            help=f"Number of features to parse and insert at a time, default={DEFAULT_BATCH_SIZE}",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+        )
+        arg_parser.add_argument(
+            "--workers",
+            "-w",
+            help="Number of processes to use for parsing geometries, default=1",
+            type=int,
+            default=1,
+        )
+        arg_parser.add_argument(
+            "--jobs",
+            "-j",
+            help="Number of files to read in parallel when importing more than one file, default=1",
+            type=int,
+            default=1,
+        )
+        arg_parser.add_argument(
+            "--fast",
+            help="Use faster but less durable SQLite settings while importing",
+            action="store_true",
+        )
+        arg_parser.add_argument(
+            "--index-strategy",
+            help=(
+                "How to maintain an existing spatial index when appending. 'rebuild' "
+                "drops it and builds it again after the import, default='incremental'"
+            ),
+            default="incremental",
+            choices=INDEX_STRATEGIES,
+        )
+        arg_parser.add_argument(
+            "--spatial-metadata",
+            help=(
+                "How to initialise a new database. 'minimal' only adds the SRIDs "
+                "which are used instead of every known SRID, default='full'"
+            ),
+            default="full",
+            choices=SPATIAL_METADATA,
+        )
+        arg_parser.add_argument(
+            "--simplify",
+            help=(
+                "Simplify geometries with this tolerance, in the units of the "
+                "input coordinates, preserving topology"
+            ),
+            type=float,
+            default=None,
+        )
+        arg_parser.add_argument(
+            "--precision",
+            help=(
+                "Snap coordinates to a grid of this size, "
+                "in the units of the input coordinates"
+            ),
+            type=float,
+            default=None,
+        )
+        arg_parser.add_argument(
+            "--simplified-column",
+            help=(
+                "Store simplified geometries in this column and keep the originals "
+                "in the geometry column"
+            ),
+            default=None,
+        )
+        skip_unchanged_arg = arg_parser.add_argument(
+            "--skip-unchanged",
+            help=(
+                "Skip files which haven't changed since they were last imported, "
+                f"using a manifest kept in the {MANIFEST_TABLE} table"
+            ),
+            action="store_true",
+        )
+        if self.infers_types:
+            arg_parser.add_argument(
+                "--infer-types",
+                help=(
+                    "Pass 'full' to read the whole file to work out column types "
+                    "before importing, instead of the first 100 features, "
+                    "default='sample'"
+                ),
+                default="sample",
+                choices=INFER_TYPES,
+            )
+        if self.json_decoder_help is not None:
+            arg_parser.add_argument(
+                "--json-decoder",
+                help=self.json_decoder_help,
+                default=None,
+                choices=JSON_DECODERS,
+            )
+        arg_parser.add_argument(
+            "--progress",
+            help="Print progress to stderr after each batch is written",
+            action="store_true",
+        )
+        arg_parser.add_argument(
+            "--stats",
+            help=(
+                "Print a JSON document of timings and counts to stderr "
+                "for each imported file"
+            ),
+            action="store_true",
+        )
 
         parsed = arg_parser.parse_args(args)
 
@@ -399,4 +1859,18 @@ class Command:
         if len(parsed.paths) > 1 and parsed.table is not None:
             raise argparse.ArgumentError(table_arg, "may not be used with >1 files")
 
+        if self.reads_stdin and STDIN in parsed.paths:
+            if len(parsed.paths) > 1:
+                raise argparse.ArgumentError(
+                    paths_arg, f"{STDIN} may not be used with other paths"
+                )
+            if parsed.table is None:
+                raise argparse.ArgumentError(
+                    table_arg, "is required when reading from stdin"
+                )
+            if parsed.skip_unchanged:
+                raise argparse.ArgumentError(
+                    skip_unchanged_arg, "may not be used when reading from stdin"
+                )
+
         return parsed
@@ -0,0 +1,48 @@
+import json
+import tempfile
+from unittest import TestCase
+
+from benchmarks.run import FORMATS, MODES, main, run_case
+
+
+class BenchmarkTests(TestCase):
+    def test_run_case(self):
+        for fmt, path in (
+            ("geojson", "tests/fixtures/geojson/valid.geojson"),
+            ("shp", "tests/fixtures/shp/points.shp"),
+        ):
+            for run, stages in (
+                ("stages", {"read", "records", "insert", "index"}),
+                ("end_to_end", {"total"}),
+            ):
+                with self.subTest(format=fmt, run=run):
+                    result = run_case(
+                        {
+                            "format": fmt,
+                            "kind": "point",
+                            "size": 3,
+                            "width": 1,
+                            "mode": "default",
+                            "run": run,
+                            "path": path,
+                            "options": {"spatialite_extension": None},
+                        }
+                    )
+                    self.assertEqual(stages, set(result["seconds"]))
+                    self.assertGreater(result["rows_per_sec"], 0)
+
+    def test_every_case(self):
+        with tempfile.NamedTemporaryFile("r", suffix=".jsonl") as output:
+            main(
+                ["--sizes", "10", "--widths", "2", "--modes", *MODES]
+                + ["--repeat", "1", "--output", output.name]
+            )
+            results = [json.loads(line) for line in output]
+        cases = {
+            (result["format"], result["kind"], result["mode"], result["run"])
+            for result in results
+        }
+        # stages are only timed with the default options
+        self.assertEqual(len(FORMATS) * 3 * (len(MODES) + 1), len(cases))
+        self.assertEqual(len(cases), len(results))
+        self.assertTrue(all(result["rows_per_sec"] > 0 for result in results))
@@ -1,11 +1,14 @@
 import argparse
 import io
+import json
+import os
+import shutil
 import sys
 import tempfile
-from unittest import TestCase
+from unittest import TestCase, mock
 
 from geometry_to_spatialite.geojson import cli
-from geometry_to_spatialite.utils import create_connection
+from geometry_to_spatialite.utils import DataImportError, create_connection
 
 
 class CliTests(TestCase):
@@ -80,6 +83,130 @@ class CliTests(TestCase):
         records = self.conn.execute("SELECT * FROM [valid-1] ORDER BY id;").fetchall()
         self.assertEqual(3, len(records))
 
+    def test_two_files_parallel(self):
+        cli.invoke(
+            paths=[
+                "tests/fixtures/geojson/valid.geojson",
+                "tests/fixtures/geojson/longcoords.geojson",
+            ],
+            dbname=self.tmp.name,
+            table="valid",
+            primary_key=None,
+            write_mode=None,
+            srid=4326,
+            geom_type="GEOMETRY",
+            spatialite_extension=None,
+            jobs=2,
+        )
+        records = self.conn.execute("SELECT * FROM valid ORDER BY id;").fetchall()
+        self.assertEqual(3, len(records))
+        records = self.conn.execute("SELECT * FROM longcoords ORDER BY id;").fetchall()
+        self.assertEqual(1, len(records))
+
+    def test_two_files_parallel_failure(self):
+        with self.assertRaises(DataImportError):
+            cli.invoke(
+                paths=[
+                    "tests/fixtures/geojson/valid.geojson",
+                    "tests/fixtures/geojson/longcoords.geojson",
+                ],
+                dbname=self.tmp.name,
+                table=None,
+                primary_key=["foo"],
+                write_mode=None,
+                srid=4326,
+                geom_type="GEOMETRY",
+                spatialite_extension=None,
+                jobs=2,
+            )
+
+    def test_progress(self):
+        sys.stderr = io.StringIO()
+        try:
+            cli.invoke(
+                paths=["tests/fixtures/geojson/valid.geojson"],
+                dbname=self.tmp.name,
+                table="valid",
+                primary_key=None,
+                write_mode=None,
+                srid=4326,
+                geom_type="GEOMETRY",
+                spatialite_extension=None,
+                progress=True,
+            )
+            lines = sys.stderr.getvalue().splitlines()
+        finally:
+            sys.stderr = sys.__stderr__
+        self.assertEqual(2, len(lines))
+        self.assertTrue(lines[0].startswith("valid: 3 features"))
+        self.assertIn("done in", lines[-1])
+
+    def test_stats(self):
+        sys.stderr = io.StringIO()
+        try:
+            cli.invoke(
+                paths=["tests/fixtures/geojson/valid.geojson"],
+                dbname=self.tmp.name,
+                table="valid",
+                primary_key=None,
+                write_mode=None,
+                srid=4326,
+                geom_type="GEOMETRY",
+                spatialite_extension=None,
+                stats=True,
+            )
+            lines = sys.stderr.getvalue().splitlines()
+        finally:
+            sys.stderr = sys.__stderr__
+        output = sys.stdout.getvalue().splitlines()
+        self.assertEqual(1, len(output))
+        self.assertTrue(output[0].startswith("Imported "))
+        stats = json.loads(lines[0])
+        self.assertEqual("valid", stats["table"])
+        self.assertEqual(3, stats["features"])
+
+    def import_unchanged(self, paths):
+        cli.invoke(
+            paths=paths,
+            dbname=self.tmp.name,
+            table=None,
+            primary_key=None,
+            write_mode="replace",
+            srid=4326,
+            geom_type="GEOMETRY",
+            spatialite_extension=None,
+            skip_unchanged=True,
+        )
+        output = sys.stdout.getvalue().splitlines()
+        sys.stdout = io.StringIO()
+        return output
+
+    def test_skip_unchanged(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "valid.geojson")
+            shutil.copy("tests/fixtures/geojson/valid.geojson", path)
+
+            self.assertEqual(
+                [f"Imported {path} into {self.tmp.name}"], self.import_unchanged([path])
+            )
+            self.assertEqual(
+                [f"Skipped {path}, unchanged since it was imported"],
+                self.import_unchanged([path]),
+            )
+
+            # touched but not modified
+            os.utime(path, (0, 0))
+            self.assertTrue(self.import_unchanged([path])[0].startswith("Skipped"))
+
+            with open(path, "a") as f:
+                f.write("\n")
+            self.assertTrue(self.import_unchanged([path])[0].startswith("Imported"))
+
+        entries = self.conn.execute(
+            "SELECT path, table_name FROM import_manifest;"
+        ).fetchall()
+        self.assertEqual([(path, "valid")], entries)
+
     def test_files_not_found(self):
         with self.assertRaises(Exception):
             cli.invoke(
@@ -95,6 +222,11 @@ class CliTests(TestCase):
 
 
 class ParseArgsTests(TestCase):
+    def test_source_srid_from_prj_not_allowed(self):
+        with mock.patch("sys.stderr", io.StringIO()):
+            with self.assertRaises(SystemExit):
+                cli.parse_args(["abc.geojson", "database.db", "--source-srid", "prj"])
+
     def test_no_db_arg(self):
         with self.assertRaises(argparse.ArgumentError):
             cli.parse_args(["abc.geojson", "def.geojson"])
@@ -112,8 +244,23 @@ class ParseArgsTests(TestCase):
         self.assertEqual(None, args.table)
         self.assertEqual(None, args.primary_key)
         self.assertEqual(4326, args.srid)
+        self.assertEqual(None, args.source_srid)
         self.assertEqual(None, args.spatialite_extension)
         self.assertEqual(None, args.write_mode)
+        self.assertEqual(1000, args.batch_size)
+        self.assertEqual(1, args.workers)
+        self.assertEqual(1, args.jobs)
+        self.assertEqual(False, args.fast)
+        self.assertEqual("incremental", args.index_strategy)
+        self.assertEqual(False, args.progress)
+        self.assertEqual(False, args.stats)
+        self.assertEqual("full", args.spatial_metadata)
+        self.assertEqual(False, args.skip_unchanged)
+        self.assertEqual(None, args.simplify)
+        self.assertEqual(None, args.precision)
+        self.assertEqual(None, args.simplified_column)
+        self.assertEqual("sample", args.infer_types)
+        self.assertEqual(None, args.json_decoder)
 
     def test_all_extra_args(self):
         args = cli.parse_args(
@@ -126,10 +273,36 @@ class ParseArgsTests(TestCase):
                 "id",
                 "-s",
                 "1234",
+                "--source-srid",
+                "27700",
                 "--spatialite-extension",
                 "/usr/lib/mod_spatialite.so",
                 "--write-mode",
                 "append",
+                "--batch-size",
+                "500",
+                "--workers",
+                "4",
+                "--jobs",
+                "8",
+                "--fast",
+                "--index-strategy",
+                "rebuild",
+                "--progress",
+                "--stats",
+                "--spatial-metadata",
+                "minimal",
+                "--skip-unchanged",
+                "--simplify",
+                "0.5",
+                "--precision",
+                "0.001",
+                "--simplified-column",
+                "simple",
+                "--infer-types",
+                "full",
+                "--json-decoder",
+                "json",
             ]
         )
         self.assertEqual(["abc.geojson"], args.paths)
@@ -137,5 +310,20 @@ class ParseArgsTests(TestCase):
         self.assertEqual("foobar", args.table)
         self.assertEqual(["id"], args.primary_key)
         self.assertEqual(1234, args.srid)
+        self.assertEqual(27700, args.source_srid)
         self.assertEqual("/usr/lib/mod_spatialite.so", args.spatialite_extension)
         self.assertEqual("append", args.write_mode)
+        self.assertEqual(500, args.batch_size)
+        self.assertEqual(4, args.workers)
+        self.assertEqual(8, args.jobs)
+        self.assertEqual(True, args.fast)
+        self.assertEqual("rebuild", args.index_strategy)
+        self.assertEqual(True, args.progress)
+        self.assertEqual(True, args.stats)
+        self.assertEqual("minimal", args.spatial_metadata)
+        self.assertEqual(True, args.skip_unchanged)
+        self.assertEqual(0.5, args.simplify)
+        self.assertEqual(0.001, args.precision)
+        self.assertEqual("simple", args.simplified_column)
+        self.assertEqual("full", args.infer_types)
+        self.assertEqual("json", args.json_decoder)
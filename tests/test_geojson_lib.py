@@ -1,9 +1,24 @@
+import io
+import json
+import os
 import tempfile
+import threading
+import types
 from sqlite3 import IntegrityError
-from unittest import TestCase
+from unittest import TestCase, mock
 
-from geometry_to_spatialite.geojson import geojson_to_spatialite
-from geometry_to_spatialite.utils import DataImportError, create_connection
+from sqlite_utils import Database
+
+from geometry_to_spatialite.geojson import (
+    JSONStream,
+    geojson_to_spatialite,
+    load_geojson,
+)
+from geometry_to_spatialite.utils import (
+    DataImportError,
+    create_connection,
+    json_decoders,
+)
 
 
 class GeoJsonToSpatialiteTests(TestCase):
@@ -68,6 +83,34 @@ class GeoJsonToSpatialiteTests(TestCase):
             27700, self.conn.execute("SELECT srid(geometry) FROM valid;").fetchone()[0]
         )
 
+    def test_success_with_source_srid(self):
+        geojson_to_spatialite(
+            self.tmp.name,
+            "tests/fixtures/geojson/valid.geojson",
+            srid=3857,
+            source_srid=4326,
+        )
+        srid, x, y = self.conn.execute(
+            "SELECT srid(geometry), ST_X(geometry), ST_Y(geometry) "
+            "FROM valid WHERE id = 1;"
+        ).fetchone()
+        self.assertEqual(3857, srid)
+        self.assertAlmostEqual(11354588.06, x, delta=0.01)
+        self.assertAlmostEqual(55660.45, y, delta=0.01)
+
+    def test_failure_reprojection_fails(self):
+        db = Database(self.conn)
+        # ST_Transform returns NULL when it can't reproject a geometry
+        self.conn.create_function("ST_Transform", 2, lambda geometry, srid: None)
+        with self.assertRaises(DataImportError):
+            geojson_to_spatialite(
+                db,
+                "tests/fixtures/geojson/valid.geojson",
+                srid=3857,
+                source_srid=4326,
+            )
+        self.assertNotIn("valid", db.table_names())
+
     def test_success_with_string_primary_key(self):
         geojson_to_spatialite(
             self.tmp.name, "tests/fixtures/geojson/valid.geojson", pk="id"
@@ -109,6 +152,21 @@ class GeoJsonToSpatialiteTests(TestCase):
         records = self.conn.execute("SELECT * FROM valid ORDER BY id;").fetchall()
         self.assertEqual(6, len(records))
 
+    def test_success_append_rebuild_index(self):
+        geojson_to_spatialite(self.tmp.name, "tests/fixtures/geojson/valid.geojson")
+        geojson_to_spatialite(
+            self.tmp.name,
+            "tests/fixtures/geojson/valid.geojson",
+            write_mode="append",
+            index_strategy="rebuild",
+        )
+        records = self.conn.execute("SELECT * FROM valid ORDER BY id;").fetchall()
+        self.assertEqual(6, len(records))
+        indexes = self.conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name='idx_valid_geometry';"
+        ).fetchall()
+        self.assertEqual(1, len(indexes))
+
     def test_success_overwrite_table(self):
         geojson_to_spatialite(self.tmp.name, "tests/fixtures/geojson/valid.geojson")
         geojson_to_spatialite(
@@ -154,6 +212,346 @@ class GeoJsonToSpatialiteTests(TestCase):
         }
         self.assertEqual("POINT", cols["geometry"])
 
+    def test_success_with_batch_size(self):
+        geojson_to_spatialite(
+            self.tmp.name, "tests/fixtures/geojson/valid.geojson", batch_size=2
+        )
+        records = self.conn.execute(
+            "SELECT id, AsText(geometry) FROM valid ORDER BY id;"
+        ).fetchall()
+        self.assertEqual(3, len(records))
+        self.assertEqual([1, 2, 3], [r[0] for r in records])
+
+    def test_success_with_workers(self):
+        geojson_to_spatialite(
+            self.tmp.name,
+            "tests/fixtures/geojson/valid.geojson",
+            batch_size=1,
+            workers=2,
+        )
+        records = self.conn.execute(
+            "SELECT id, AsText(geometry) FROM valid ORDER BY rowid;"
+        ).fetchall()
+        self.assertEqual([1, 2, 3], [r[0] for r in records])
+
+    def test_workers_are_not_forked_from_another_thread(self):
+        fork = os.fork
+        threads = []
+
+        def record_fork():
+            threads.append(threading.current_thread())
+            return fork()
+
+        with mock.patch("os.fork", record_fork):
+            geojson_to_spatialite(
+                self.tmp.name,
+                "tests/fixtures/geojson/valid.geojson",
+                batch_size=1,
+                workers=2,
+            )
+        # with the "fork" start method, records are made in a background
+        # thread, so the workers must have been forked before it started
+        self.assertTrue(all(t is threading.main_thread() for t in threads))
+
+    def test_success_fast(self):
+        geojson_to_spatialite(
+            self.tmp.name, "tests/fixtures/geojson/valid.geojson", fast=True
+        )
+        self.assertEqual(3, len(self.conn.execute("SELECT * FROM valid;").fetchall()))
+        self.assertEqual(
+            "delete", self.conn.execute("PRAGMA journal_mode;").fetchone()[0]
+        )
+
+    def test_success_with_observer(self):
+        reports = []
+        geojson_to_spatialite(
+            self.tmp.name,
+            "tests/fixtures/geojson/valid.geojson",
+            batch_size=2,
+            observer=lambda stats: reports.append((stats.features, stats.done)),
+        )
+        self.assertEqual([(2, False), (3, False), (3, True)], reports)
+
+    def test_observer_stats(self):
+        reports = []
+        geojson_to_spatialite(
+            self.tmp.name,
+            "tests/fixtures/geojson/valid.geojson",
+            observer=reports.append,
+        )
+        stats = reports[-1].as_dict()
+        self.assertEqual("valid", stats["table"])
+        self.assertEqual(3, stats["features"])
+        self.assertEqual(
+            os.path.getsize("tests/fixtures/geojson/valid.geojson"), stats["bytes_read"]
+        )
+        self.assertEqual({"read", "records", "insert", "index"}, set(stats["stages"]))
+        self.assertGreater(stats["elapsed"], 0)
+
+    def test_success_with_open_database(self):
+        db = Database(self.conn)
+        geojson_to_spatialite(db, "tests/fixtures/geojson/valid.geojson")
+        geojson_to_spatialite(
+            db, "tests/fixtures/geojson/valid.geojson", table_name="valid2"
+        )
+        # the connection is left open for the caller to keep using
+        self.assertEqual(3, db["valid"].count)
+        self.assertEqual(3, db["valid2"].count)
+
+    def test_success_minimal_spatial_metadata(self):
+        with tempfile.NamedTemporaryFile(suffix=".db") as tmp:
+            geojson_to_spatialite(
+                tmp.name,
+                "tests/fixtures/geojson/valid.geojson",
+                srid=27700,
+                spatial_metadata="minimal",
+            )
+            geojson_to_spatialite(
+                tmp.name,
+                "tests/fixtures/geojson/valid.geojson",
+                table_name="valid2",
+                srid=27700,
+                spatial_metadata="minimal",
+            )
+            db = create_connection(tmp.name, None)
+            srids = db.execute("SELECT srid FROM spatial_ref_sys;").fetchall()
+            self.assertEqual([(27700,)], srids)
+            self.assertEqual(3, db["valid"].count)
+            db.conn.close()
+
+    def test_success_srid_not_in_spatial_ref_sys(self):
+        # with full metadata, SRIDs are left to SpatiaLite as they are
+        geojson_to_spatialite(
+            self.tmp.name, "tests/fixtures/geojson/valid.geojson", srid=123456
+        )
+        self.assertEqual(3, Database(self.conn)["valid"].count)
+
+    def test_success_minimal_spatial_metadata_undefined_srid(self):
+        with tempfile.NamedTemporaryFile(suffix=".db") as tmp:
+            geojson_to_spatialite(
+                tmp.name,
+                "tests/fixtures/geojson/valid.geojson",
+                srid=0,
+                spatial_metadata="minimal",
+            )
+            db = create_connection(tmp.name, None)
+            self.assertEqual(3, db["valid"].count)
+            db.conn.close()
+
+    def test_failure_minimal_spatial_metadata_unknown_srid(self):
+        with tempfile.NamedTemporaryFile(suffix=".db") as tmp:
+            with self.assertRaises(DataImportError):
+                geojson_to_spatialite(
+                    tmp.name,
+                    "tests/fixtures/geojson/valid.geojson",
+                    srid=123456,
+                    spatial_metadata="minimal",
+                )
+
+    def write_mixed_types(self, f):
+        features = [
+            {"type": "Feature", "geometry": None, "properties": {"code": i}}
+            for i in range(150)
+        ]
+        features[120]["properties"] = {"code": "A1", "late": 1.5}
+        json.dump({"type": "FeatureCollection", "features": features}, f)
+        f.flush()
+
+    def test_success_infer_types_sample(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".geojson") as f:
+            self.write_mixed_types(f)
+            geojson_to_spatialite(self.tmp.name, f.name, table_name="mixed")
+        db = Database(self.conn)
+        self.assertEqual(int, db["mixed"].columns_dict["code"])
+        self.assertEqual(float, db["mixed"].columns_dict["late"])
+
+    def test_success_infer_types_full(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".geojson") as f:
+            self.write_mixed_types(f)
+            geojson_to_spatialite(
+                self.tmp.name, f.name, table_name="mixed", infer_types="full"
+            )
+        db = Database(self.conn)
+        self.assertEqual(["code", "late", "geometry"], list(db["mixed"].columns_dict))
+        self.assertEqual(str, db["mixed"].columns_dict["code"])
+        self.assertEqual(float, db["mixed"].columns_dict["late"])
+        self.assertEqual(150, db["mixed"].count)
+
+    def track_updates(self, table):
+        self.conn.execute("CREATE TABLE updates (id INTEGER);")
+        self.conn.execute(
+            f"CREATE TRIGGER track_updates AFTER UPDATE ON {table} "
+            "BEGIN INSERT INTO updates VALUES (new.id); END;"
+        )
+        self.conn.commit()
+
+    def test_success_upsert(self):
+        geojson_to_spatialite(
+            self.tmp.name, "tests/fixtures/geojson/valid.geojson", pk="id"
+        )
+        self.conn.execute("UPDATE valid SET prop0 = 'changed' WHERE id = 1;")
+        self.conn.execute("DELETE FROM valid WHERE id = 3;")
+        self.conn.commit()
+        self.track_updates("valid")
+
+        geojson_to_spatialite(
+            self.tmp.name,
+            "tests/fixtures/geojson/valid.geojson",
+            pk="id",
+            write_mode="upsert",
+        )
+
+        records = self.conn.execute(
+            "SELECT id, prop0 FROM valid ORDER BY id;"
+        ).fetchall()
+        self.assertEqual([(1, "string"), (2, "string"), (3, "string")], records)
+        # unchanged rows are left alone
+        updates = self.conn.execute("SELECT id FROM updates;").fetchall()
+        self.assertEqual([(1,)], updates)
+
+    def test_success_sync(self):
+        geojson_to_spatialite(
+            self.tmp.name, "tests/fixtures/geojson/valid.geojson", pk="id"
+        )
+        self.conn.execute("INSERT INTO valid (id, prop0) VALUES (99, 'gone');")
+        self.conn.commit()
+
+        geojson_to_spatialite(
+            self.tmp.name,
+            "tests/fixtures/geojson/valid.geojson",
+            pk="id",
+            write_mode="sync",
+        )
+
+        records = self.conn.execute("SELECT id FROM valid ORDER BY id;").fetchall()
+        self.assertEqual([(1,), (2,), (3,)], records)
+
+    def test_success_upsert_stores_values_as_insert(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".geojson") as f:
+            properties = {"tags": ["a", "é"], "meta": {"x": 1.5}, "flag": True}
+            json.dump(
+                {
+                    "type": "FeatureCollection",
+                    "features": [
+                        {
+                            "type": "Feature",
+                            "geometry": None,
+                            "properties": {"code": i, **properties},
+                        }
+                        for i in range(2)
+                    ],
+                },
+                f,
+            )
+            f.flush()
+            geojson_to_spatialite(self.tmp.name, f.name, table_name="a", pk="code")
+            geojson_to_spatialite(
+                self.tmp.name, f.name, table_name="b", pk="code", write_mode="upsert"
+            )
+        query = "SELECT code, tags, meta, flag FROM {} ORDER BY code;"
+        self.assertEqual(
+            self.conn.execute(query.format("a")).fetchall(),
+            self.conn.execute(query.format("b")).fetchall(),
+        )
+
+    def test_failure_upsert_without_pk(self):
+        with self.assertRaises(ValueError):
+            geojson_to_spatialite(
+                self.tmp.name,
+                "tests/fixtures/geojson/valid.geojson",
+                write_mode="upsert",
+            )
+
+    def test_failure_upsert_different_pk(self):
+        geojson_to_spatialite(self.tmp.name, "tests/fixtures/geojson/valid.geojson")
+        with self.assertRaises(DataImportError):
+            geojson_to_spatialite(
+                self.tmp.name,
+                "tests/fixtures/geojson/valid.geojson",
+                pk="id",
+                write_mode="upsert",
+            )
+
+    def test_success_null_properties(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".geojson") as f:
+            json.dump(
+                {
+                    "type": "FeatureCollection",
+                    "features": [
+                        {
+                            "type": "Feature",
+                            "id": 1,
+                            "geometry": None,
+                            "properties": None,
+                        },
+                        {
+                            "type": "Feature",
+                            "id": 2,
+                            "geometry": None,
+                            "properties": {},
+                        },
+                    ],
+                },
+                f,
+            )
+            f.flush()
+            geojson_to_spatialite(self.tmp.name, f.name, table_name="nulls", pk="id")
+        records = self.conn.execute("SELECT id FROM nulls ORDER BY id;").fetchall()
+        self.assertEqual([(1,), (2,)], records)
+
+    def test_success_nested_properties(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".geojson") as f:
+            json.dump(
+                {
+                    "type": "FeatureCollection",
+                    "features": [
+                        {
+                            "type": "Feature",
+                            "geometry": None,
+                            "properties": {"tags": {"a": 1}, "names": ["x", "y"]},
+                        }
+                    ],
+                },
+                f,
+            )
+            f.flush()
+            geojson_to_spatialite(self.tmp.name, f.name, table_name="nested")
+        records = self.conn.execute("SELECT tags, names FROM nested;").fetchall()
+        self.assertEqual([('{"a": 1}', '["x", "y"]')], records)
+
+    def test_success_with_simplify(self):
+        geojson_to_spatialite(
+            self.tmp.name, "tests/fixtures/geojson/valid.geojson", simplify=2
+        )
+        records = self.conn.execute(
+            "SELECT AsText(geometry) FROM valid WHERE id = 2;"
+        ).fetchall()
+        self.assertEqual([("LINESTRING(102 0, 105 1)",)], records)
+
+    def test_success_with_simplified_column(self):
+        geojson_to_spatialite(
+            self.tmp.name,
+            "tests/fixtures/geojson/valid.geojson",
+            simplify=2,
+            simplified_column="simple",
+        )
+        records = self.conn.execute(
+            "SELECT AsText(geometry), AsText(simple) FROM valid WHERE id = 2;"
+        ).fetchall()
+        self.assertEqual(
+            [("LINESTRING(102 0, 103 1, 104 0, 105 1)", "LINESTRING(102 0, 105 1)")],
+            records,
+        )
+
+    def test_success_with_precision(self):
+        geojson_to_spatialite(
+            self.tmp.name, "tests/fixtures/geojson/longcoords.geojson", precision=0.001
+        )
+        records = self.conn.execute(
+            "SELECT AsText(geometry) FROM longcoords;"
+        ).fetchall()
+        self.assertEqual([("POINT(102.123 0.988)",)], records)
+
     def test_failure_table_already_exists(self):
         geojson_to_spatialite(self.tmp.name, "tests/fixtures/geojson/valid.geojson")
         with self.assertRaises(DataImportError):
@@ -174,12 +572,96 @@ class GeoJsonToSpatialiteTests(TestCase):
                 self.tmp.name, "tests/fixtures/geojson/valid.geojson", srid="foobar"
             )
 
+    def test_failure_invalid_source_srid(self):
+        with self.assertRaises(TypeError):
+            geojson_to_spatialite(
+                self.tmp.name,
+                "tests/fixtures/geojson/valid.geojson",
+                source_srid="foobar",
+            )
+
     def test_failure_invalid_pk(self):
         with self.assertRaises(TypeError):
             geojson_to_spatialite(
                 self.tmp.name, "tests/fixtures/geojson/valid.geojson", pk=7
             )
 
+    def test_failure_invalid_batch_size(self):
+        with self.assertRaises(ValueError):
+            geojson_to_spatialite(
+                self.tmp.name, "tests/fixtures/geojson/valid.geojson", batch_size=0
+            )
+
+    def test_failure_invalid_workers(self):
+        with self.assertRaises(TypeError):
+            geojson_to_spatialite(
+                self.tmp.name, "tests/fixtures/geojson/valid.geojson", workers="many"
+            )
+
+    def test_success_with_json_decoders(self):
+        for name in json_decoders():
+            with self.subTest(name):
+                geojson_to_spatialite(
+                    self.tmp.name,
+                    "tests/fixtures/geojson/valid.geojson",
+                    table_name=name,
+                    json_decoder=name,
+                    infer_types="full",
+                )
+                records = self.conn.execute(
+                    f"SELECT id, prop0, prop1, AsText(geometry) FROM {name} ORDER BY id;"
+                ).fetchall()
+                self.assertEqual(3, len(records))
+                self.assertEqual((1, "string", None, "POINT(102 0.5)"), records[0])
+
+    def test_failure_invalid_json_decoder(self):
+        with self.assertRaises(ValueError):
+            geojson_to_spatialite(
+                self.tmp.name,
+                "tests/fixtures/geojson/valid.geojson",
+                json_decoder="foobar",
+            )
+
+    def test_failure_invalid_index_strategy(self):
+        with self.assertRaises(ValueError):
+            geojson_to_spatialite(
+                self.tmp.name,
+                "tests/fixtures/geojson/valid.geojson",
+                index_strategy="foobar",
+            )
+
+    def test_failure_invalid_spatial_metadata(self):
+        with self.assertRaises(ValueError):
+            geojson_to_spatialite(
+                self.tmp.name,
+                "tests/fixtures/geojson/valid.geojson",
+                spatial_metadata="foobar",
+            )
+
+    def test_failure_invalid_infer_types(self):
+        with self.assertRaises(ValueError):
+            geojson_to_spatialite(
+                self.tmp.name,
+                "tests/fixtures/geojson/valid.geojson",
+                infer_types="foobar",
+            )
+
+    def test_failure_invalid_simplify(self):
+        with self.assertRaises(ValueError):
+            geojson_to_spatialite(
+                self.tmp.name, "tests/fixtures/geojson/valid.geojson", simplify=0
+            )
+        with self.assertRaises(TypeError):
+            geojson_to_spatialite(
+                self.tmp.name, "tests/fixtures/geojson/valid.geojson", precision="1"
+            )
+        with self.assertRaises(ValueError):
+            geojson_to_spatialite(
+                self.tmp.name,
+                "tests/fixtures/geojson/valid.geojson",
+                simplified_column="simple",
+            )
+
     def test_failure_invalid_write_mode(self):
         with self.assertRaises(ValueError):
             geojson_to_spatialite(
@@ -200,6 +682,140 @@ class GeoJsonToSpatialiteTests(TestCase):
                 self.tmp.name, "tests/fixtures/geojson/valid.geojson", pk="prop1"
             )
 
+    def write_features(self, f, ids):
+        json.dump(
+            {
+                "type": "FeatureCollection",
+                "features": [
+                    {"type": "Feature", "geometry": None, "properties": {"code": i}}
+                    for i in ids
+                ],
+            },
+            f,
+        )
+        f.flush()
+
+    def test_failure_duplicate_pk(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".geojson") as f:
+            self.write_features(f, ["a", "b", "a"])
+            with self.assertRaises(DataImportError):
+                geojson_to_spatialite(self.tmp.name, f.name, pk="code")
+
+    def test_failure_null_pk(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".geojson") as f:
+            self.write_features(f, ["a", None])
+            with self.assertRaises(DataImportError):
+                geojson_to_spatialite(self.tmp.name, f.name, pk="code")
+
+    def test_failure_upsert_composite_key_with_null(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".geojson") as f:
+            json.dump(
+                {
+                    "type": "FeatureCollection",
+                    "features": [
+                        {
+                            "type": "Feature",
+                            "geometry": None,
+                            "properties": {"code": 1, "b": None},
+                        }
+                    ]
+                    * 2,
+                },
+                f,
+            )
+            f.flush()
+            with self.assertRaises(DataImportError):
+                geojson_to_spatialite(
+                    self.tmp.name, f.name, pk=["code", "b"], write_mode="upsert"
+                )
+
+    def test_failure_is_rolled_back(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".geojson") as f:
+            self.write_features(f, ["a", "b", None])
+            with self.assertRaises(DataImportError):
+                geojson_to_spatialite(
+                    self.tmp.name, f.name, table_name="t", pk="code", batch_size=1
+                )
+        self.assertNotIn("t", Database(self.conn).table_names())
+
+    def test_failure_replace_keeps_original_rows(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".geojson") as f:
+            self.write_features(f, ["a", "b"])
+            geojson_to_spatialite(self.tmp.name, f.name, table_name="t", pk="code")
+        with tempfile.NamedTemporaryFile("w", suffix=".geojson") as f:
+            self.write_features(f, ["c", "d", None])
+            with self.assertRaises(DataImportError):
+                geojson_to_spatialite(
+                    self.tmp.name,
+                    f.name,
+                    table_name="t",
+                    pk="code",
+                    write_mode="replace",
+                    batch_size=1,
+                )
+        records = self.conn.execute("SELECT code FROM t ORDER BY code;").fetchall()
+        self.assertEqual([("a",), ("b",)], records)
+
+    def test_failure_rebuild_index_keeps_index(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".geojson") as f:
+            self.write_features(f, ["a", "b"])
+            geojson_to_spatialite(self.tmp.name, f.name, table_name="t", pk="code")
+        with tempfile.NamedTemporaryFile("w", suffix=".geojson") as f:
+            self.write_features(f, ["c", "a"])
+            with self.assertRaises(DataImportError):
+                geojson_to_spatialite(
+                    self.tmp.name,
+                    f.name,
+                    table_name="t",
+                    pk="code",
+                    write_mode="append",
+                    index_strategy="rebuild",
+                    batch_size=1,
+                )
+        records = self.conn.execute("SELECT code FROM t ORDER BY code;").fetchall()
+        self.assertEqual([("a",), ("b",)], records)
+        indexes = self.conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name='idx_t_geometry';"
+        ).fetchall()
+        self.assertEqual(1, len(indexes))
+
+    def start_transaction(self):
+        self.conn.execute("CREATE TABLE pending (id INTEGER);")
+        self.conn.execute("INSERT INTO pending VALUES (1);")
+        self.assertTrue(self.conn.in_transaction)
+
+    def test_open_transaction_is_not_committed(self):
+        self.start_transaction()
+        geojson_to_spatialite(
+            Database(self.conn), "tests/fixtures/geojson/valid.geojson"
+        )
+        # the import is nested in the caller's transaction
+        self.assertTrue(self.conn.in_transaction)
+        self.conn.rollback()
+        self.assertEqual([], self.conn.execute("SELECT * FROM pending;").fetchall())
+        self.assertNotIn("valid", Database(self.conn).table_names())
+
+    def test_failure_open_transaction_is_kept(self):
+        self.start_transaction()
+        with tempfile.NamedTemporaryFile("w", suffix=".geojson") as f:
+            self.write_features(f, ["a", "b", None])
+            with self.assertRaises(DataImportError):
+                geojson_to_spatialite(
+                    Database(self.conn), f.name, table_name="t", pk="code"
+                )
+        self.assertTrue(self.conn.in_transaction)
+        self.assertNotIn("t", Database(self.conn).table_names())
+        self.conn.commit()
+        self.assertEqual([(1,)], self.conn.execute("SELECT * FROM pending;").fetchall())
+
+    def test_failure_fast_with_open_transaction(self):
+        self.start_transaction()
+        with self.assertRaises(DataImportError):
+            geojson_to_spatialite(
+                Database(self.conn), "tests/fixtures/geojson/valid.geojson", fast=True
+            )
+        self.assertTrue(self.conn.in_transaction)
+
     def test_failure_incorrect_geom_type(self):
         with self.assertRaises(IntegrityError):
             geojson_to_spatialite(
@@ -215,3 +831,97 @@ class GeoJsonToSpatialiteTests(TestCase):
                 "tests/fixtures/geojson/valid.geojson",
                 geom_type="NOT-A-GEOM-TYPE",
             )
+
+
+class LoadGeoJsonTests(TestCase):
+    def test_features_are_streamed(self):
+        features = load_geojson(open("tests/fixtures/geojson/valid.geojson"))
+        self.assertIsInstance(features, types.GeneratorType)
+        features = list(features)
+        self.assertEqual(3, len(features))
+        # features are yielded as they are in the file
+        self.assertEqual({"prop0": "string"}, features[0]["properties"])
+        self.assertEqual(1, features[0]["id"])
+
+    def test_type_after_features(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".geojson") as f:
+            json.dump(
+                {
+                    "features": [
+                        {
+                            "type": "Feature",
+                            "geometry": None,
+                            "properties": {"prop0": i},
+                        }
+                        for i in range(1000)
+                    ],
+                    "bbox": [100.0, 0.0, 105.0, 1.0],
+                    "type": "FeatureCollection",
+                },
+                f,
+            )
+            f.flush()
+            features = list(load_geojson(open(f.name)))
+        self.assertEqual(1000, len(features))
+        self.assertEqual({"prop0": 999}, features[-1]["properties"])
+
+    def test_empty_feature_collection(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".geojson") as f:
+            json.dump({"type": "FeatureCollection", "features": []}, f)
+            f.flush()
+            self.assertEqual([], list(load_geojson(open(f.name))))
+
+    def test_failure_not_featurecollection(self):
+        with self.assertRaises(DataImportError):
+            list(load_geojson(open("tests/fixtures/geojson/feature.geojson")))
+
+    def test_skip_geometry(self):
+        features = list(load_geojson(open("tests/fixtures/geojson/valid.geojson")))
+        for feature in features:
+            del feature["geometry"]
+        self.assertEqual(
+            features,
+            list(
+                load_geojson(
+                    open("tests/fixtures/geojson/valid.geojson"), skip_geometry=True
+                )
+            ),
+        )
+
+    def test_object_without(self):
+        document = (
+            '[{"type": "Feature", "geometry": {"type": "Point",'
+            ' "coordinates": [1.5, -2e3], "note": "{\\"}"}, "id": 10},'
+            ' {"a\\u0062": [{}, "}"], "geometry": null}, {}]'
+        )
+        # every chunk size moves the chunk boundaries somewhere new
+        for chunk_size in range(1, len(document) + 1):
+            stream = JSONStream(io.StringIO(document), chunk_size)
+            self.assertTrue(stream.start("[", "]"))
+            self.assertEqual(
+                {"type": "Feature", "id": 10}, stream.object_without("geometry")
+            )
+            self.assertTrue(stream.next_item("]"))
+            self.assertEqual({"ab": [{}, "}"]}, stream.object_without("geometry"))
+            self.assertTrue(stream.next_item("]"))
+            self.assertEqual({}, stream.object_without("geometry"))
+            self.assertFalse(stream.next_item("]"))
+
+    def test_failure_object_without_unterminated(self):
+        stream = JSONStream(io.StringIO('{"geometry": {"coordinates": [1, 2]}'))
+        with self.assertRaises(json.JSONDecodeError):
+            stream.object_without("geometry")
+
+    def test_whole_document_decoder(self):
+        features = list(
+            load_geojson(open("tests/fixtures/geojson/valid.geojson"), json.loads)
+        )
+        self.assertEqual(
+            list(load_geojson(open("tests/fixtures/geojson/valid.geojson"))), features
+        )
+
+    def test_failure_whole_document_not_featurecollection(self):
+        with self.assertRaises(DataImportError):
+            list(
+                load_geojson(open("tests/fixtures/geojson/feature.geojson"), json.loads)
+            )
@@ -0,0 +1,122 @@
+import argparse
+import io
+import sys
+import tempfile
+from unittest import TestCase, mock
+
+from geometry_to_spatialite.geojsonseq import cli
+from geometry_to_spatialite.utils import create_connection
+
+
+class CliTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.NamedTemporaryFile(suffix=".db")
+        db = create_connection(self.tmp.name, None)
+        self.conn = db.conn
+        sys.stdout = io.StringIO()
+
+    def tearDown(self):
+        self.tmp.close()
+        sys.stdout = sys.__stdout__
+
+    def test_success(self):
+        cli.invoke(
+            paths=["tests/fixtures/geojsonseq/valid.geojsonseq"],
+            dbname=self.tmp.name,
+            table="valid",
+            primary_key=None,
+            write_mode=None,
+            srid=4326,
+            geom_type="GEOMETRY",
+            spatialite_extension=None,
+        )
+        records = self.conn.execute("SELECT * FROM valid ORDER BY id;").fetchall()
+        self.assertEqual(3, len(records))
+
+    def test_two_files_parallel(self):
+        cli.invoke(
+            paths=[
+                "tests/fixtures/geojsonseq/valid.geojsonseq",
+                "tests/fixtures/geojsonseq/newline.geojsonseq",
+            ],
+            dbname=self.tmp.name,
+            table=None,
+            primary_key=None,
+            write_mode=None,
+            srid=4326,
+            geom_type="GEOMETRY",
+            spatialite_extension=None,
+            jobs=2,
+        )
+        records = self.conn.execute("SELECT * FROM valid ORDER BY id;").fetchall()
+        self.assertEqual(3, len(records))
+        records = self.conn.execute("SELECT * FROM newline ORDER BY id;").fetchall()
+        self.assertEqual(3, len(records))
+
+    def test_two_files_parallel_json_decoder(self):
+        cli.invoke(
+            paths=[
+                "tests/fixtures/geojsonseq/valid.geojsonseq",
+                "tests/fixtures/geojsonseq/newline.geojsonseq",
+            ],
+            dbname=self.tmp.name,
+            table=None,
+            primary_key=None,
+            write_mode=None,
+            srid=4326,
+            geom_type="GEOMETRY",
+            spatialite_extension=None,
+            jobs=2,
+            json_decoder="json",
+        )
+        records = self.conn.execute("SELECT * FROM newline ORDER BY id;").fetchall()
+        self.assertEqual(3, len(records))
+
+    def test_stdin(self):
+        with open("tests/fixtures/geojsonseq/valid.geojsonseq") as stdin:
+            with mock.patch("sys.stdin", stdin):
+                cli.invoke(
+                    paths=["-"],
+                    dbname=self.tmp.name,
+                    table="piped",
+                    primary_key=None,
+                    write_mode=None,
+                    srid=4326,
+                    geom_type="GEOMETRY",
+                    spatialite_extension=None,
+                )
+        records = self.conn.execute("SELECT * FROM piped ORDER BY id;").fetchall()
+        self.assertEqual(3, len(records))
+
+
+class ParseArgsTests(TestCase):
+    def test_no_extra_args(self):
+        args = cli.parse_args(["abc.geojsonseq", "database.db"])
+        self.assertEqual(["abc.geojsonseq"], args.paths)
+        self.assertEqual("database.db", args.dbname)
+        self.assertEqual(None, args.table)
+        self.assertEqual("sample", args.infer_types)
+        self.assertEqual(None, args.json_decoder)
+
+    def test_json_decoder(self):
+        args = cli.parse_args(
+            ["abc.geojsonseq", "database.db", "--json-decoder", "json"]
+        )
+        self.assertEqual("json", args.json_decoder)
+
+    def test_stdin(self):
+        args = cli.parse_args(["-", "database.db", "-t", "piped"])
+        self.assertEqual(["-"], args.paths)
+        self.assertEqual("piped", args.table)
+
+    def test_stdin_without_table(self):
+        with self.assertRaises(argparse.ArgumentError):
+            cli.parse_args(["-", "database.db"])
+
+    def test_stdin_with_other_paths(self):
+        with self.assertRaises(argparse.ArgumentError):
+            cli.parse_args(["-", "abc.geojsonseq", "database.db"])
+
+    def test_stdin_with_skip_unchanged(self):
+        with self.assertRaises(argparse.ArgumentError):
+            cli.parse_args(["-", "database.db", "-t", "piped", "--skip-unchanged"])
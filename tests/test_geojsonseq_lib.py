@@ -0,0 +1,160 @@
+import os
+import tempfile
+from unittest import TestCase, mock
+
+from geometry_to_spatialite.geojsonseq import (
+    decode_lines,
+    geojsonseq_to_spatialite,
+    load_lines,
+)
+from geometry_to_spatialite.utils import (
+    DataImportError,
+    create_connection,
+    json_decoders,
+)
+
+
+class GeoJsonSeqToSpatialiteTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.NamedTemporaryFile(suffix=".db")
+        db = create_connection(self.tmp.name, None)
+        self.conn = db.conn
+
+    def tearDown(self):
+        self.tmp.close()
+
+    def assert_valid_records(self, table):
+        records = self.conn.execute(
+            f"SELECT id, prop0, prop1, AsText(geometry) FROM {table} ORDER BY id;"
+        ).fetchall()
+        self.assertEqual(3, len(records))
+        self.assertEqual((1, "string", None, "POINT(102 0.5)"), records[0])
+        self.assertEqual(
+            (2, "string", 0, "LINESTRING(102 0, 103 1, 104 0, 105 1)"), records[1]
+        )
+        self.assertEqual(
+            (3, "string", 7, "POLYGON((100 0, 101 0, 101 1, 100 1, 100 0))"), records[2]
+        )
+
+    def test_success_with_defaults(self):
+        geojsonseq_to_spatialite(
+            self.tmp.name, "tests/fixtures/geojsonseq/valid.geojsonseq"
+        )
+        self.assert_valid_records("valid")
+
+        # make sure the columns have the corect types
+        cols = self.conn.execute("PRAGMA table_info('valid');").fetchall()
+        self.assertDictEqual(
+            {
+                "id": "INTEGER",
+                "prop0": "TEXT",
+                "prop1": "FLOAT",
+                "geometry": "GEOMETRY",
+            },
+            {col[1]: col[2] for col in cols},
+        )
+
+        # ensure the spatial index was created
+        indexes = self.conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name='idx_valid_geometry';"
+        ).fetchall()
+        self.assertEqual(1, len(indexes))
+
+    def test_success_newline_delimited(self):
+        geojsonseq_to_spatialite(
+            self.tmp.name, "tests/fixtures/geojsonseq/newline.geojsonseq"
+        )
+        self.assert_valid_records("newline")
+
+    def test_success_with_workers(self):
+        geojsonseq_to_spatialite(
+            self.tmp.name,
+            "tests/fixtures/geojsonseq/valid.geojsonseq",
+            batch_size=1,
+            workers=2,
+        )
+        records = self.conn.execute("SELECT id FROM valid ORDER BY rowid;").fetchall()
+        self.assertEqual([(1,), (2,), (3,)], records)
+
+    def test_success_infer_types_full(self):
+        geojsonseq_to_spatialite(
+            self.tmp.name,
+            "tests/fixtures/geojsonseq/valid.geojsonseq",
+            infer_types="full",
+        )
+        self.assert_valid_records("valid")
+
+    def test_success_from_stdin(self):
+        with open("tests/fixtures/geojsonseq/valid.geojsonseq") as stdin:
+            with mock.patch("sys.stdin", stdin):
+                geojsonseq_to_spatialite(self.tmp.name, "-", table_name="piped")
+        self.assert_valid_records("piped")
+
+    def test_observer_stats(self):
+        reports = []
+        geojsonseq_to_spatialite(
+            self.tmp.name,
+            "tests/fixtures/geojsonseq/valid.geojsonseq",
+            observer=reports.append,
+        )
+        stats = reports[-1].as_dict()
+        self.assertEqual(3, stats["features"])
+        self.assertEqual(
+            os.path.getsize("tests/fixtures/geojsonseq/valid.geojsonseq"),
+            stats["bytes_read"],
+        )
+
+    def test_success_with_json_decoders(self):
+        for name in json_decoders():
+            with self.subTest(name):
+                geojsonseq_to_spatialite(
+                    self.tmp.name,
+                    "tests/fixtures/geojsonseq/valid.geojsonseq",
+                    table_name=name,
+                    json_decoder=name,
+                    workers=2,
+                )
+                self.assert_valid_records(name)
+
+    def test_failure_invalid_json_decoder(self):
+        with self.assertRaises(ValueError):
+            geojsonseq_to_spatialite(
+                self.tmp.name,
+                "tests/fixtures/geojsonseq/valid.geojsonseq",
+                json_decoder="foobar",
+            )
+
+    def test_failure_stdin_without_table_name(self):
+        with self.assertRaises(ValueError):
+            geojsonseq_to_spatialite(self.tmp.name, "-")
+
+    def test_failure_stdin_infer_types_full(self):
+        with self.assertRaises(ValueError):
+            geojsonseq_to_spatialite(
+                self.tmp.name, "-", table_name="piped", infer_types="full"
+            )
+
+    def test_failure_invalid_json(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".geojsonseq") as f:
+            f.write('{"type": "Feature", "geometry": null, "properties": {}}\n')
+            f.write('{"type": "Feature", "geometry": null,\n')
+            f.flush()
+            with self.assertRaises(DataImportError):
+                geojsonseq_to_spatialite(self.tmp.name, f.name)
+
+
+class DecodeLinesTests(TestCase):
+    def test_lines_are_streamed(self):
+        with open("tests/fixtures/geojsonseq/newline.geojsonseq", "rb") as f:
+            lines = load_lines(f)
+            self.assertEqual(b'{"type": "Feature", "id": 1', next(lines)[:27])
+            # blank lines are skipped
+            self.assertEqual(2, len(list(lines)))
+
+    def test_record_separators_are_removed(self):
+        features = decode_lines([b'\x1e{"type": "Feature", "id": 1}\n'])
+        self.assertEqual([{"type": "Feature", "id": 1}], features)
+
+    def test_failure_not_a_feature(self):
+        with self.assertRaises(DataImportError):
+            decode_lines([b'{"type": "FeatureCollection", "features": []}\n'])
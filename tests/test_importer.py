@@ -0,0 +1,53 @@
+import sqlite3
+import tempfile
+from unittest import TestCase
+
+from sqlite_utils import Database
+
+from geometry_to_spatialite import Importer
+from geometry_to_spatialite.utils import create_connection
+
+
+class ImporterTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.NamedTemporaryFile(suffix=".db")
+        db = create_connection(self.tmp.name, None)
+        self.conn = db.conn
+
+    def tearDown(self):
+        self.tmp.close()
+
+    def test_import_many_files(self):
+        with Importer(self.tmp.name) as importer:
+            importer.import_geojson("tests/fixtures/geojson/valid.geojson")
+            importer.import_shp("tests/fixtures/shp/points.shp")
+            importer.import_shp("tests/fixtures/shp/polygons.shp", srid=27700)
+            db = importer.db
+        self.assertEqual(
+            {"valid", "points", "polygons"},
+            set(Database(self.conn).table_names()) & {"valid", "points", "polygons"},
+        )
+        with self.assertRaises(sqlite3.ProgrammingError):
+            db.execute("SELECT 1;")
+
+    def test_import_geojsonseq(self):
+        with Importer(self.tmp.name) as importer:
+            importer.import_geojsonseq(
+                "tests/fixtures/geojsonseq/valid.geojsonseq", table_name="seq"
+            )
+        self.assertEqual(3, Database(self.conn)["seq"].count)
+
+    def test_open_database_is_left_open(self):
+        db = Database(self.conn)
+        with Importer(db) as importer:
+            importer.import_geojson("tests/fixtures/geojson/valid.geojson")
+        self.assertEqual(3, db["valid"].count)
+
+    def test_minimal_spatial_metadata(self):
+        with tempfile.NamedTemporaryFile(suffix=".db") as tmp:
+            with Importer(tmp.name, spatial_metadata="minimal") as importer:
+                importer.import_shp("tests/fixtures/shp/polygons.shp", srid=27700)
+                srids = importer.db.execute(
+                    "SELECT srid FROM spatial_ref_sys;"
+                ).fetchall()
+        self.assertEqual([(27700,)], srids)
@@ -1,5 +1,8 @@
 import argparse
 import io
+import json
+import os
+import shutil
 import sys
 import tempfile
 from unittest import TestCase
@@ -79,6 +82,128 @@ class CliTests(TestCase):
         ).fetchall()
         self.assertEqual(3, len(records))
 
+    def test_multiple_files_parallel(self):
+        cli.invoke(
+            paths=["tests/fixtures/shp/"],
+            dbname=self.tmp.name,
+            table="irrelevant",
+            primary_key=None,
+            write_mode=None,
+            srid=4326,
+            geom_type="GEOMETRY",
+            spatialite_extension=None,
+            jobs=2,
+        )
+        records = self.conn.execute("SELECT * FROM [./points] ORDER BY id;").fetchall()
+        self.assertEqual(3, len(records))
+        records = self.conn.execute(
+            "SELECT * FROM [./polygons] ORDER BY id;"
+        ).fetchall()
+        self.assertEqual(3, len(records))
+        indexes = self.conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name='idx_./points_geometry';"
+        ).fetchall()
+        self.assertEqual(1, len(indexes))
+
+    def test_progress(self):
+        sys.stderr = io.StringIO()
+        try:
+            cli.invoke(
+                paths=["tests/fixtures/shp/points.shp"],
+                dbname=self.tmp.name,
+                table="points",
+                primary_key=None,
+                write_mode=None,
+                srid=4326,
+                geom_type="GEOMETRY",
+                spatialite_extension=None,
+                progress=True,
+            )
+            lines = sys.stderr.getvalue().splitlines()
+        finally:
+            sys.stderr = sys.__stderr__
+        self.assertEqual(2, len(lines))
+        self.assertTrue(lines[0].startswith("points: 3 features"))
+        self.assertIn("done in", lines[-1])
+
+    def test_stats(self):
+        sys.stderr = io.StringIO()
+        try:
+            cli.invoke(
+                paths=["tests/fixtures/shp/points.shp"],
+                dbname=self.tmp.name,
+                table="points",
+                primary_key=None,
+                write_mode=None,
+                srid=4326,
+                geom_type="GEOMETRY",
+                spatialite_extension=None,
+                stats=True,
+            )
+            lines = sys.stderr.getvalue().splitlines()
+        finally:
+            sys.stderr = sys.__stderr__
+        output = sys.stdout.getvalue().splitlines()
+        self.assertEqual(1, len(output))
+        self.assertTrue(output[0].startswith("Imported "))
+        stats = json.loads(lines[0])
+        self.assertEqual("points", stats["table"])
+        self.assertEqual(3, stats["features"])
+
+    def import_unchanged(self, paths):
+        cli.invoke(
+            paths=paths,
+            dbname=self.tmp.name,
+            table=None,
+            primary_key=None,
+            write_mode="replace",
+            srid=4326,
+            geom_type="GEOMETRY",
+            spatialite_extension=None,
+            skip_unchanged=True,
+        )
+        output = sys.stdout.getvalue().splitlines()
+        sys.stdout = io.StringIO()
+        return output
+
+    def test_skip_unchanged(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for ext in ("shp", "shx", "dbf", "prj"):
+                shutil.copy(f"tests/fixtures/shp/points.{ext}", tmpdir)
+
+            self.assertEqual(
+                [f"Imported {tmpdir}/points.shp into {self.tmp.name}"],
+                self.import_unchanged([tmpdir]),
+            )
+            self.assertEqual(
+                [f"Skipped {tmpdir}/points.shp, unchanged since it was imported"],
+                self.import_unchanged([tmpdir]),
+            )
+
+            # a change to any of the shapefile's files is an update
+            with open(os.path.join(tmpdir, "points.prj"), "a") as f:
+                f.write(" ")
+            self.assertTrue(self.import_unchanged([tmpdir])[0].startswith("Imported"))
+
+    def test_two_files_parallel_source_srid_from_prj(self):
+        cli.invoke(
+            paths=["tests/fixtures/shp/points.shp", "tests/fixtures/shp/polygons.shp"],
+            dbname=self.tmp.name,
+            table=None,
+            primary_key=None,
+            write_mode=None,
+            srid=3857,
+            geom_type="GEOMETRY",
+            spatialite_extension=None,
+            jobs=2,
+            source_srid="prj",
+        )
+        x, y = self.conn.execute(
+            "SELECT ST_X(geometry), ST_Y(geometry) FROM points WHERE id = 1;"
+        ).fetchone()
+        self.assertAlmostEqual(11354588.06, x, delta=0.01)
+        self.assertAlmostEqual(55660.45, y, delta=0.01)
+
     def test_files_not_found(self):
         with self.assertRaises(Exception):
             cli.invoke(
@@ -94,6 +219,10 @@ class CliTests(TestCase):
 
 
 class ParseArgsTests(TestCase):
+    def test_source_srid_from_prj(self):
+        args = cli.parse_args(["abc.shp", "database.db", "--source-srid", "prj"])
+        self.assertEqual("prj", args.source_srid)
+
     def test_no_db_arg(self):
         with self.assertRaises(argparse.ArgumentError):
             cli.parse_args(["abc.shp", "def.shp"])
@@ -109,8 +238,22 @@ class ParseArgsTests(TestCase):
         self.assertEqual(None, args.table)
         self.assertEqual(None, args.primary_key)
         self.assertEqual(4326, args.srid)
+        self.assertEqual(None, args.source_srid)
         self.assertEqual(None, args.spatialite_extension)
         self.assertEqual(None, args.write_mode)
+        self.assertEqual(1000, args.batch_size)
+        self.assertEqual(1, args.workers)
+        self.assertEqual(1, args.jobs)
+        self.assertEqual(False, args.fast)
+        self.assertEqual("incremental", args.index_strategy)
+        self.assertEqual(False, args.progress)
+        self.assertEqual(False, args.stats)
+        self.assertEqual("full", args.spatial_metadata)
+        self.assertEqual(False, args.skip_unchanged)
+        self.assertEqual(None, args.simplify)
+        self.assertEqual(None, args.precision)
+        self.assertEqual(None, args.simplified_column)
+        self.assertFalse(hasattr(args, "infer_types"))
 
     def test_all_extra_args(self):
         args = cli.parse_args(
@@ -123,10 +266,32 @@ class ParseArgsTests(TestCase):
                 "id",
                 "-s",
                 "1234",
+                "--source-srid",
+                "27700",
                 "--spatialite-extension",
                 "/usr/lib/mod_spatialite.so",
                 "--write-mode",
                 "append",
+                "--batch-size",
+                "500",
+                "--workers",
+                "4",
+                "--jobs",
+                "8",
+                "--fast",
+                "--index-strategy",
+                "rebuild",
+                "--progress",
+                "--stats",
+                "--spatial-metadata",
+                "minimal",
+                "--skip-unchanged",
+                "--simplify",
+                "0.5",
+                "--precision",
+                "0.001",
+                "--simplified-column",
+                "simple",
             ]
         )
         self.assertEqual(["abc.shp"], args.paths)
@@ -134,5 +299,18 @@ class ParseArgsTests(TestCase):
         self.assertEqual("foobar", args.table)
         self.assertEqual(["id"], args.primary_key)
         self.assertEqual(1234, args.srid)
+        self.assertEqual(27700, args.source_srid)
         self.assertEqual("/usr/lib/mod_spatialite.so", args.spatialite_extension)
         self.assertEqual("append", args.write_mode)
+        self.assertEqual(500, args.batch_size)
+        self.assertEqual(4, args.workers)
+        self.assertEqual(8, args.jobs)
+        self.assertEqual(True, args.fast)
+        self.assertEqual("rebuild", args.index_strategy)
+        self.assertEqual(True, args.progress)
+        self.assertEqual(True, args.stats)
+        self.assertEqual("minimal", args.spatial_metadata)
+        self.assertEqual(True, args.skip_unchanged)
+        self.assertEqual(0.5, args.simplify)
+        self.assertEqual(0.001, args.precision)
+        self.assertEqual("simple", args.simplified_column)
@@ -1,9 +1,37 @@
+import os
+import shutil
+import struct
 import tempfile
 from sqlite3 import IntegrityError
 from unittest import TestCase
 
-from geometry_to_spatialite.shapefile import shp_to_spatialite
-from geometry_to_spatialite.utils import DataImportError, create_connection
+import shapefile
+from shapely import wkb
+from shapely.geometry import shape
+from sqlite_utils import Database
+
+from geometry_to_spatialite.shapefile import (
+    dbf_column_converter,
+    load_dbf,
+    load_shp,
+    read_shp,
+    shp_to_spatialite,
+)
+from geometry_to_spatialite.utils import (
+    DataImportError,
+    FeatureSource,
+    create_connection,
+)
+
+BRITISH_NATIONAL_GRID = (
+    'PROJCS["OSGB_1936_British_National_Grid",GEOGCS["GCS_OSGB 1936",'
+    'DATUM["D_OSGB_1936",SPHEROID["Airy_1830",6377563.396,299.3249646]],'
+    'PRIMEM["Greenwich",0],UNIT["Degree",0.017453292519943295]],'
+    'PROJECTION["Transverse_Mercator"],PARAMETER["latitude_of_origin",49],'
+    'PARAMETER["central_meridian",-2],PARAMETER["scale_factor",0.9996012717],'
+    'PARAMETER["false_easting",400000],PARAMETER["false_northing",-100000],'
+    'UNIT["Meter",1]]'
+)
 
 
 class ShpToSpatialiteTests(TestCase):
@@ -101,6 +129,57 @@ class ShpToSpatialiteTests(TestCase):
             27700, self.conn.execute("SELECT srid(geometry) FROM points;").fetchone()[0]
         )
 
+    def assert_web_mercator(self):
+        srid, x, y = self.conn.execute(
+            "SELECT srid(geometry), ST_X(geometry), ST_Y(geometry) "
+            "FROM points WHERE id = 1;"
+        ).fetchone()
+        self.assertEqual(3857, srid)
+        self.assertAlmostEqual(11354588.06, x, delta=0.01)
+        self.assertAlmostEqual(55660.45, y, delta=0.01)
+
+    def test_success_with_source_srid(self):
+        shp_to_spatialite(
+            self.tmp.name,
+            "tests/fixtures/shp/points.shp",
+            srid=3857,
+            source_srid=4326,
+        )
+        self.assert_web_mercator()
+
+    def test_success_with_srid_from_prj(self):
+        shp_to_spatialite(
+            self.tmp.name,
+            "tests/fixtures/shp/points.shp",
+            srid=3857,
+            source_srid="prj",
+        )
+        self.assert_web_mercator()
+
+    def test_success_prj_is_ignored_by_default(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for extension in (".shp", ".shx", ".dbf"):
+                shutil.copy(f"tests/fixtures/shp/points{extension}", tmpdir)
+            with open(os.path.join(tmpdir, "points.prj"), "w") as f:
+                f.write(BRITISH_NATIONAL_GRID)
+            shp_to_spatialite(self.tmp.name, os.path.join(tmpdir, "points.shp"))
+
+        record = self.conn.execute(
+            "SELECT srid(geometry), AsText(geometry) FROM points WHERE id = 1;"
+        ).fetchone()
+        self.assertEqual((4326, "POINT(102 0.5)"), record)
+
+    def test_failure_srid_from_missing_prj(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for extension in (".shp", ".shx", ".dbf"):
+                shutil.copy(f"tests/fixtures/shp/points{extension}", tmpdir)
+            with self.assertRaises(DataImportError):
+                shp_to_spatialite(
+                    self.tmp.name,
+                    os.path.join(tmpdir, "points.shp"),
+                    source_srid="prj",
+                )
+
     def test_success_with_string_primary_key(self):
         shp_to_spatialite(self.tmp.name, "tests/fixtures/shp/points.shp", pk="id")
         self.assertEqual(3, len(self.conn.execute("SELECT * FROM points;").fetchall()))
@@ -138,6 +217,21 @@ class ShpToSpatialiteTests(TestCase):
         records = self.conn.execute("SELECT * FROM points ORDER BY id;").fetchall()
         self.assertEqual(6, len(records))
 
+    def test_success_append_rebuild_index(self):
+        shp_to_spatialite(self.tmp.name, "tests/fixtures/shp/points.shp")
+        shp_to_spatialite(
+            self.tmp.name,
+            "tests/fixtures/shp/points.shp",
+            write_mode="append",
+            index_strategy="rebuild",
+        )
+        records = self.conn.execute("SELECT * FROM points ORDER BY id;").fetchall()
+        self.assertEqual(6, len(records))
+        indexes = self.conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name='idx_points_geometry';"
+        ).fetchall()
+        self.assertEqual(1, len(indexes))
+
     def test_success_overwrite_table(self):
         shp_to_spatialite(self.tmp.name, "tests/fixtures/shp/points.shp")
         shp_to_spatialite(
@@ -165,6 +259,160 @@ class ShpToSpatialiteTests(TestCase):
         }
         self.assertEqual("POINT", cols["geometry"])
 
+    def test_success_with_batch_size(self):
+        shp_to_spatialite(self.tmp.name, "tests/fixtures/shp/points.shp", batch_size=2)
+        records = self.conn.execute(
+            "SELECT id, AsText(geometry) FROM points ORDER BY id;"
+        ).fetchall()
+        self.assertEqual(3, len(records))
+        self.assertEqual([1, 2, 3], [r[0] for r in records])
+
+    def test_success_with_workers(self):
+        shp_to_spatialite(
+            self.tmp.name, "tests/fixtures/shp/points.shp", batch_size=1, workers=2
+        )
+        records = self.conn.execute(
+            "SELECT id, AsText(geometry) FROM points ORDER BY rowid;"
+        ).fetchall()
+        self.assertEqual([1, 2, 3], [r[0] for r in records])
+
+    def test_success_fast(self):
+        shp_to_spatialite(self.tmp.name, "tests/fixtures/shp/points.shp", fast=True)
+        self.assertEqual(3, len(self.conn.execute("SELECT * FROM points;").fetchall()))
+        self.assertEqual(
+            "delete", self.conn.execute("PRAGMA journal_mode;").fetchone()[0]
+        )
+
+    def test_success_with_observer(self):
+        reports = []
+        shp_to_spatialite(
+            self.tmp.name,
+            "tests/fixtures/shp/points.shp",
+            batch_size=2,
+            observer=lambda stats: reports.append((stats.features, stats.done)),
+        )
+        self.assertEqual([(2, False), (3, False), (3, True)], reports)
+
+    def test_observer_stats(self):
+        reports = []
+        shp_to_spatialite(
+            self.tmp.name, "tests/fixtures/shp/points.shp", observer=reports.append
+        )
+        stats = reports[-1].as_dict()
+        self.assertEqual("points", stats["table"])
+        self.assertEqual(3, stats["features"])
+        self.assertEqual(
+            os.path.getsize("tests/fixtures/shp/points.shp")
+            + os.path.getsize("tests/fixtures/shp/points.dbf"),
+            stats["bytes_read"],
+        )
+        self.assertEqual({"read", "records", "insert", "index"}, set(stats["stages"]))
+
+    def test_success_with_open_database(self):
+        db = Database(self.conn)
+        shp_to_spatialite(db, "tests/fixtures/shp/points.shp")
+        shp_to_spatialite(db, "tests/fixtures/shp/polygons.shp")
+        # the connection is left open for the caller to keep using
+        self.assertEqual(3, db["points"].count)
+        self.assertEqual(3, db["polygons"].count)
+
+    def test_success_minimal_spatial_metadata(self):
+        with tempfile.NamedTemporaryFile(suffix=".db") as tmp:
+            shp_to_spatialite(
+                tmp.name,
+                "tests/fixtures/shp/points.shp",
+                srid=27700,
+                spatial_metadata="minimal",
+            )
+            shp_to_spatialite(
+                tmp.name,
+                "tests/fixtures/shp/points.shp",
+                table_name="points2",
+                srid=27700,
+                spatial_metadata="minimal",
+            )
+            db = create_connection(tmp.name, None)
+            srids = db.execute("SELECT srid FROM spatial_ref_sys;").fetchall()
+            self.assertEqual([(27700,)], srids)
+            self.assertEqual(3, db["points"].count)
+            db.conn.close()
+
+    def track_updates(self, table):
+        self.conn.execute("CREATE TABLE updates (id INTEGER);")
+        self.conn.execute(
+            f"CREATE TRIGGER track_updates AFTER UPDATE ON {table} "
+            "BEGIN INSERT INTO updates VALUES (new.id); END;"
+        )
+        self.conn.commit()
+
+    def test_success_upsert(self):
+        shp_to_spatialite(self.tmp.name, "tests/fixtures/shp/points.shp", pk="id")
+        self.conn.execute("UPDATE points SET prop0 = 'changed' WHERE id = 1;")
+        self.conn.execute("DELETE FROM points WHERE id = 3;")
+        self.conn.commit()
+        self.track_updates("points")
+
+        shp_to_spatialite(
+            self.tmp.name, "tests/fixtures/shp/points.shp", pk="id", write_mode="upsert"
+        )
+
+        records = self.conn.execute(
+            "SELECT id, prop0 FROM points ORDER BY id;"
+        ).fetchall()
+        self.assertEqual([(1, "string"), (2, "string"), (3, "string")], records)
+        # unchanged rows are left alone
+        updates = self.conn.execute("SELECT id FROM updates;").fetchall()
+        self.assertEqual([(1,)], updates)
+
+    def test_success_sync(self):
+        shp_to_spatialite(self.tmp.name, "tests/fixtures/shp/points.shp", pk="id")
+        self.conn.execute("INSERT INTO points (id, prop0) VALUES (99, 'gone');")
+        self.conn.commit()
+
+        shp_to_spatialite(
+            self.tmp.name, "tests/fixtures/shp/points.shp", pk="id", write_mode="sync"
+        )
+
+        records = self.conn.execute("SELECT id FROM points ORDER BY id;").fetchall()
+        self.assertEqual([(1,), (2,), (3,)], records)
+
+    def test_failure_upsert_without_pk(self):
+        with self.assertRaises(ValueError):
+            shp_to_spatialite(
+                self.tmp.name, "tests/fixtures/shp/points.shp", write_mode="upsert"
+            )
+
+    def test_failure_upsert_different_pk(self):
+        shp_to_spatialite(self.tmp.name, "tests/fixtures/shp/points.shp")
+        with self.assertRaises(DataImportError):
+            shp_to_spatialite(
+                self.tmp.name,
+                "tests/fixtures/shp/points.shp",
+                pk="id",
+                write_mode="upsert",
+            )
+
+    def test_success_with_simplified_column(self):
+        shp_to_spatialite(
+            self.tmp.name,
+            "tests/fixtures/shp/polygons.shp",
+            simplify=0.5,
+            simplified_column="simple",
+        )
+        records = self.conn.execute(
+            "SELECT AsText(geometry) = AsText(simple) FROM polygons;"
+        ).fetchall()
+        self.assertEqual([(1,), (1,), (1,)], records)
+
+    def test_success_with_precision(self):
+        shp_to_spatialite(self.tmp.name, "tests/fixtures/shp/points.shp", precision=2)
+        records = self.conn.execute(
+            "SELECT AsText(geometry) FROM points ORDER BY id;"
+        ).fetchall()
+        self.assertEqual(
+            [("POINT(102 0)",), ("POINT(102 0)",), ("POINT(100 0)",)], records
+        )
+
     def test_failure_table_already_exists(self):
         shp_to_spatialite(self.tmp.name, "tests/fixtures/shp/points.shp")
         with self.assertRaises(DataImportError):
@@ -177,6 +425,26 @@ class ShpToSpatialiteTests(TestCase):
                 self.tmp.name, "tests/fixtures/shp/points.shp", write_mode="append"
             )
 
+    def test_failure_upsert_composite_key_with_null(self):
+        # prop1 is null in the first feature
+        with self.assertRaises(DataImportError):
+            shp_to_spatialite(
+                self.tmp.name,
+                "tests/fixtures/shp/points.shp",
+                pk=["id", "prop1"],
+                write_mode="upsert",
+            )
+
+    def test_failure_append_duplicate_pk(self):
+        shp_to_spatialite(self.tmp.name, "tests/fixtures/shp/points.shp", pk="id")
+        with self.assertRaises(DataImportError):
+            shp_to_spatialite(
+                self.tmp.name,
+                "tests/fixtures/shp/points.shp",
+                pk="id",
+                write_mode="append",
+            )
+
     def test_failure_invalid_srid(self):
         with self.assertRaises(TypeError):
             shp_to_spatialite(
@@ -187,6 +455,38 @@ class ShpToSpatialiteTests(TestCase):
         with self.assertRaises(TypeError):
             shp_to_spatialite(self.tmp.name, "tests/fixtures/shp/points.shp", pk=7)
 
+    def test_failure_invalid_batch_size(self):
+        with self.assertRaises(ValueError):
+            shp_to_spatialite(
+                self.tmp.name, "tests/fixtures/shp/points.shp", batch_size=0
+            )
+
+    def test_failure_invalid_workers(self):
+        with self.assertRaises(TypeError):
+            shp_to_spatialite(
+                self.tmp.name, "tests/fixtures/shp/points.shp", workers="many"
+            )
+
+    def test_failure_invalid_index_strategy(self):
+        with self.assertRaises(ValueError):
+            shp_to_spatialite(
+                self.tmp.name, "tests/fixtures/shp/points.shp", index_strategy="foobar"
+            )
+
+    def test_failure_invalid_spatial_metadata(self):
+        with self.assertRaises(ValueError):
+            shp_to_spatialite(
+                self.tmp.name,
+                "tests/fixtures/shp/points.shp",
+                spatial_metadata="foobar",
+            )
+
+    def test_failure_invalid_simplify(self):
+        with self.assertRaises(ValueError):
+            shp_to_spatialite(
+                self.tmp.name, "tests/fixtures/shp/points.shp", simplify=-1
+            )
+
     def test_failure_invalid_write_mode(self):
         with self.assertRaises(ValueError):
             shp_to_spatialite(
@@ -206,3 +506,212 @@ class ShpToSpatialiteTests(TestCase):
                 "tests/fixtures/shp/points.shp",
                 geom_type="NOT-A-GEOM-TYPE",
             )
+
+
+class ReadShpTests(TestCase):
+    def test_features_are_streamed(self):
+        features, columns = read_shp("tests/fixtures/shp/polygons.shp")
+        self.assertIsInstance(features, FeatureSource)
+        self.assertEqual(
+            {"id": "INTEGER", "prop0": "TEXT", "prop1": "INTEGER"}, columns
+        )
+        features = list(features)
+        self.assertEqual(3, len(features))
+        self.assertEqual(
+            {"id": 1, "prop0": "string", "prop1": True}, features[0]["properties"]
+        )
+        # geometries are read straight into WKB
+        self.assertEqual("Polygon", wkb.loads(features[0]["geometry"]).geom_type)
+
+    def test_bytes_read(self):
+        features, _ = read_shp("tests/fixtures/shp/polygons.shp")
+        self.assertLess(features.bytes_read, features.size)
+        list(features)
+        self.assertEqual(
+            os.path.getsize("tests/fixtures/shp/polygons.shp")
+            + os.path.getsize("tests/fixtures/shp/polygons.dbf"),
+            features.bytes_read,
+        )
+
+
+class LoadShpTests(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "shapes")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def assert_same_geometries(self, shapes):
+        features = list(load_shp(shapefile.Reader(self.path)))
+        expected = [
+            s.__geo_interface__ if s.shapeType else None
+            for s in shapefile.Reader(self.path).shapes()
+        ]
+        self.assertEqual(len(shapes), len(features))
+        for feature, geo_interface in zip(features, expected):
+            geometry = feature["geometry"]
+            if geo_interface is None:
+                self.assertIsNone(geometry)
+                continue
+            if isinstance(geometry, bytes):
+                geometry = wkb.loads(geometry)
+            else:
+                geometry = shape(geometry)
+            self.assertTrue(geometry.equals(shape(geo_interface)))
+            self.assertEqual(shape(geo_interface).geom_type, geometry.geom_type)
+        return features
+
+    def write(self, shape_type, shapes):
+        with shapefile.Writer(self.path, shapeType=shape_type) as w:
+            w.field("id", "N")
+            for i, (method, args) in enumerate(shapes):
+                getattr(w, method)(*args)
+                w.record(i)
+
+    def test_polygons(self):
+        exterior = [[0, 0], [0, 10], [10, 10], [10, 0], [0, 0]]
+        hole = [[2, 2], [4, 2], [4, 4], [2, 4], [2, 2]]
+        other = [[20, 0], [20, 10], [30, 10], [30, 0], [20, 0]]
+        shapes = [
+            ("poly", [[exterior]]),
+            ("poly", [[hole, exterior]]),
+            ("poly", [[exterior, other]]),
+            ("null", []),
+        ]
+        self.write(shapefile.POLYGON, shapes)
+        features = self.assert_same_geometries(shapes)
+        self.assertTrue(all(isinstance(f["geometry"], bytes) for f in features[:3]))
+
+    def test_polygons_read_by_pyshp(self):
+        exterior = [[0, 0], [0, 10], [10, 10], [10, 0], [0, 0]]
+        hole = [[2, 2], [4, 2], [4, 4], [2, 4], [2, 2]]
+        other = [[20, 0], [20, 10], [30, 10], [30, 0], [20, 0]]
+        shapes = [
+            ("poly", [[exterior, hole, other]]),
+            ("poly", [[exterior]]),
+        ]
+        self.write(shapefile.POLYGON, shapes)
+        features = self.assert_same_geometries(shapes)
+        # holes are matched to exteriors by pyshp
+        self.assertIsInstance(features[0]["geometry"], dict)
+        self.assertIsInstance(features[1]["geometry"], bytes)
+
+    def test_lines_and_points(self):
+        self.write(
+            shapefile.POLYLINE,
+            [
+                ("line", [[[[0, 0], [1, 1], [2, 0]]]]),
+                ("line", [[[[0, 0], [1, 1]], [[5, 5], [6, 6], [7, 5]]]]),
+            ],
+        )
+        self.assert_same_geometries([None, None])
+
+        self.write(shapefile.MULTIPOINT, [("multipoint", [[[0, 0], [1.5, 2.5]]])])
+        self.assert_same_geometries([None])
+
+        self.write(shapefile.POINT, [("point", [1.5, 2.5])])
+        self.assert_same_geometries([None])
+
+
+class LoadDbfTests(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "records")
+        with shapefile.Writer(self.path, shapeType=shapefile.POINT) as w:
+            w.field("int", "N", size=10)
+            w.field("float", "N", size=12, decimal=3)
+            w.field("double", "F", size=18, decimal=8)
+            w.field("bool", "L")
+            w.field("date", "D")
+            w.field("text", "C", size=20)
+            rows = [
+                [1, 1.5, 0.12345678, True, "20200131", "one"],
+                [-2, -2.25, 3.0, False, "19991231", "twö"],
+                [None, None, None, None, None, None],
+                [4, 4.0, 4.0, True, "20240229", ""],
+                [5, 5.5, 5.5, False, "20000101", "five"],
+            ]
+            for i, row in enumerate(rows):
+                w.point(i, i)
+                w.record(*row)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def expected(self):
+        with shapefile.Reader(self.path) as sf:
+            return [
+                record.as_dict(date_strings=True)
+                for record in sf.iterRecords(deleted_as_None=True)
+            ]
+
+    def test_records_match_pyshp(self):
+        for batch_size in (1, 2, 1000):
+            with shapefile.Reader(self.path) as sf:
+                self.assertEqual(self.expected(), list(load_dbf(sf, batch_size)))
+
+    def test_types(self):
+        with shapefile.Reader(self.path) as sf:
+            records = list(load_dbf(sf))
+        self.assertEqual(
+            {
+                "int": 1,
+                "float": 1.5,
+                "double": 0.12345678,
+                "bool": True,
+                "date": "20200131",
+                "text": "one",
+            },
+            records[0],
+        )
+        self.assertEqual("twö", records[1]["text"])
+        self.assertEqual(
+            {"int", "float", "double", "bool", "date"},
+            {k for k, v in records[2].items() if v is None},
+        )
+
+    def test_qgis_nulls(self):
+        with shapefile.Reader(self.path) as sf:
+            # QGIS writes null numbers as asterisks
+            converters = [
+                dbf_column_converter(f, "utf-8", "strict") for f in sf.fields[1:4]
+            ]
+        for convert in converters:
+            self.assertEqual([None, 7], convert([b"*" * 10, b"         7"]))
+
+    def write_date(self, record, value):
+        with open(self.path + ".dbf", "rb") as f:
+            header_length, record_length = struct.unpack_from("<HH", f.read(12), 8)
+        with shapefile.Reader(self.path) as sf:
+            # after the deletion flag and the fields before the date
+            offset = 1 + sum(field[2] for field in sf.fields[1:5])
+        with open(self.path + ".dbf", "r+b") as f:
+            f.seek(header_length + record * record_length + offset)
+            f.write(value)
+
+    def test_malformed_dates(self):
+        self.write_date(0, b"2020ab31")
+        # pyshp keeps a date which can't be parsed as it is
+        expected = self.expected()[0]
+        self.write_date(1, b"1999\xff231")
+        with shapefile.Reader(self.path) as sf:
+            records = list(load_dbf(sf))
+        self.assertEqual(expected, records[0])
+        self.assertEqual("2020ab31", records[0]["date"])
+        self.assertEqual("1999\ufffd231", records[1]["date"])
+        self.assertEqual("twö", records[1]["text"])
+
+    def test_deleted_records_are_skipped(self):
+        with open(self.path + ".dbf", "rb") as f:
+            header_length, record_length = struct.unpack_from("<HH", f.read(12), 8)
+        with open(self.path + ".dbf", "r+b") as f:
+            f.seek(header_length + record_length)
+            f.write(b"*")
+
+        with shapefile.Reader(self.path) as sf:
+            self.assertIsNone(list(load_dbf(sf))[1])
+        features = list(load_shp(shapefile.Reader(self.path)))
+        self.assertEqual([1, None, 4, 5], [f["properties"]["int"] for f in features])
+        # shapes stay aligned with their records
+        self.assertEqual((3.0, 3.0), wkb.loads(features[2]["geometry"]).coords[0])
@@ -0,0 +1,299 @@
+import json
+import queue
+import sqlite3
+import tempfile
+from unittest import TestCase, mock
+
+from shapely.geometry import shape
+from sqlite_utils import Database
+
+from geometry_to_spatialite import utils
+from geometry_to_spatialite.utils import (
+    DataImportError,
+    GeometryTable,
+    ImportStats,
+    bulk_load_pragmas,
+    find_json_decoder,
+    format_progress,
+    geometries_to_wkb,
+    json_decoders,
+    make_file_records,
+    queued_records,
+)
+
+
+class GeometriesToWkbTests(TestCase):
+    geometries = [
+        {"type": "Point", "coordinates": [102.0, 0.5]},
+        None,
+        {"type": "LineString", "coordinates": [[102.0, 0.0], [103.0, 1.0]]},
+        {
+            "type": "Polygon",
+            "coordinates": [
+                [[100.0, 0.0], [101.0, 0.0], [101.0, 1.0], [100.0, 1.0], [100.0, 0.0]],
+                [[100.2, 0.2], [100.8, 0.2], [100.8, 0.8], [100.2, 0.8], [100.2, 0.2]],
+            ],
+        },
+        {"type": "Point", "coordinates": [102.123456789, 0.987654321]},
+        {
+            "type": "MultiPolygon",
+            "coordinates": [
+                [
+                    [
+                        [102.0, 2.0],
+                        [103.0, 2.0],
+                        [103.0, 3.0],
+                        [102.0, 3.0],
+                        [102.0, 2.0],
+                    ]
+                ],
+                [
+                    [
+                        [100.0, 0.0],
+                        [101.0, 0.0],
+                        [101.0, 1.0],
+                        [100.0, 1.0],
+                        [100.0, 0.0],
+                    ]
+                ],
+            ],
+        },
+        {
+            "type": "GeometryCollection",
+            "geometries": [{"type": "Point", "coordinates": [100.0, 0.0]}],
+        },
+    ]
+
+    def expected(self):
+        return [shape(g).wkb if g else None for g in self.geometries]
+
+    def test_batch_matches_one_at_a_time(self):
+        self.assertEqual(self.expected(), geometries_to_wkb(self.geometries))
+
+    def test_mixed_dimensions(self):
+        geometries = [
+            {"type": "Point", "coordinates": [102.0, 0.5]},
+            {"type": "Point", "coordinates": [102.0, 0.5, 7.0]},
+        ]
+        self.assertEqual(
+            [shape(g).wkb for g in geometries], geometries_to_wkb(geometries)
+        )
+
+    def test_empty_parts(self):
+        multipolygon = self.geometries[5]
+        self.assertEqual(
+            [shape(multipolygon).wkb, b"\x01\x06\x00\x00\x00\x00\x00\x00\x00"],
+            geometries_to_wkb(
+                [multipolygon, {"type": "MultiPolygon", "coordinates": [[]]}]
+            ),
+        )
+        # shape() can't make a MultiPolygon with an empty part either
+        with self.assertRaises((IndexError, ValueError)):
+            geometries_to_wkb(
+                [
+                    multipolygon,
+                    {
+                        "type": "MultiPolygon",
+                        "coordinates": multipolygon["coordinates"][:1] + [[]],
+                    },
+                ]
+            )
+
+    def test_without_ragged_arrays(self):
+        with mock.patch.object(utils, "from_ragged_array", None):
+            self.assertEqual(self.expected(), geometries_to_wkb(self.geometries))
+
+    def test_unclosed_ring(self):
+        geometries = [
+            {
+                "type": "Polygon",
+                "coordinates": [[[100.0, 0.0], [101.0, 0.0], [101.0, 1.0]]],
+            },
+        ]
+        self.assertEqual(
+            [shape(g).wkb for g in geometries], geometries_to_wkb(geometries)
+        )
+
+
+class JsonDecodersTests(TestCase):
+    def test_decoders_give_the_same_result(self):
+        document = b'{"type": "Feature", "id": 1, "properties": {"a": [1.5, null]}}'
+        for name, loads in json_decoders().items():
+            with self.subTest(name):
+                self.assertEqual(json.loads(document), loads(document))
+
+    def test_invalid_json_raises_value_error(self):
+        for name, loads in json_decoders().items():
+            with self.subTest(name):
+                with self.assertRaises(ValueError):
+                    loads(b'{"type": ')
+
+    def test_falls_back_to_json(self):
+        with (
+            mock.patch.object(utils, "orjson", None),
+            mock.patch.object(utils, "msgspec", None),
+        ):
+            self.assertEqual({"json": json.loads}, json_decoders())
+
+
+class FindJsonDecoderTests(TestCase):
+    def test_fastest_by_default(self):
+        self.assertIs(next(iter(json_decoders().values())), find_json_decoder())
+
+    def test_by_name(self):
+        self.assertIs(json.loads, find_json_decoder("json"))
+
+    def test_failure_unknown_decoder(self):
+        with self.assertRaises(ValueError):
+            find_json_decoder("foobar")
+
+    def test_failure_not_installed(self):
+        with mock.patch.object(utils, "orjson", None):
+            with self.assertRaises(ValueError):
+                find_json_decoder("orjson")
+
+
+class MakeFileRecordsTests(TestCase):
+    features = [
+        {"type": "Feature", "geometry": None, "properties": {"prop0": i}}
+        for i in range(5)
+    ]
+
+    def make_file_records(self, reader):
+        records_queue = queue.Queue()
+        make_file_records(
+            reader,
+            ("t", "file.geojson"),
+            records_queue=records_queue,
+            srid=4326,
+            pk=None,
+            write_mode=None,
+            geom_type="GEOMETRY",
+            batch_size=2,
+            simplify=None,
+            precision=None,
+            simplified_column=None,
+            decode=None,
+        )
+        return records_queue
+
+    def test_batches_are_queued(self):
+        records_queue = self.make_file_records(
+            lambda filename: (iter(self.features), {"prop0": int})
+        )
+        batches = queued_records(records_queue)
+        self.assertEqual({"prop0": int}, next(batches))
+        self.assertEqual([2, 2, 1], [len(batch) for batch in batches])
+        self.assertTrue(records_queue.empty())
+
+    def test_failure_is_queued(self):
+        def reader(filename):
+            raise DataImportError(f"{filename} is broken")
+
+        records_queue = self.make_file_records(reader)
+        with self.assertRaisesRegex(DataImportError, "file.geojson is broken"):
+            list(queued_records(records_queue))
+
+
+class BulkLoadPragmasTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.NamedTemporaryFile(suffix=".db")
+        self.conn = sqlite3.connect(self.tmp.name)
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmp.close()
+
+    def pragma(self, name):
+        return self.conn.execute(f"PRAGMA {name};").fetchone()[0]
+
+    def test_pragmas_are_restored(self):
+        with bulk_load_pragmas(self.conn):
+            self.assertEqual("memory", self.pragma("journal_mode"))
+            self.assertEqual(0, self.pragma("synchronous"))
+            self.assertEqual(2, self.pragma("temp_store"))
+        self.assertEqual("delete", self.pragma("journal_mode"))
+        self.assertEqual(2, self.pragma("synchronous"))
+        self.assertEqual(0, self.pragma("temp_store"))
+
+    def test_wal_is_left_alone(self):
+        self.conn.execute("PRAGMA journal_mode = WAL;")
+        with bulk_load_pragmas(self.conn):
+            self.assertEqual("wal", self.pragma("journal_mode"))
+            self.assertEqual(0, self.pragma("synchronous"))
+        self.assertEqual("wal", self.pragma("journal_mode"))
+
+
+class ImportStatsTests(TestCase):
+    def test_stages(self):
+        stats = ImportStats("table")
+        self.assertEqual([1, 2], list(stats.timed("read", [1, 2])))
+        self.assertEqual(["a"], list(stats.collect("records", [("a", 2.5)])))
+        with stats.timing("insert"):
+            pass
+        self.assertGreater(stats.stages["read"], 0)
+        self.assertEqual(2.5, stats.stages["records"])
+        self.assertGreater(stats.stages["insert"], 0)
+        self.assertEqual(0, stats.stages["index"])
+
+    def test_done(self):
+        stats = ImportStats("table")
+        stats.features = 10
+        self.assertFalse(stats.done)
+        stats.end()
+        self.assertTrue(stats.done)
+        self.assertEqual(stats.elapsed, stats.elapsed)
+        self.assertEqual(10 / stats.elapsed, stats.as_dict()["features_per_sec"])
+
+    def test_without_source(self):
+        stats = ImportStats("table")
+        self.assertIsNone(stats.as_dict()["bytes_read"])
+        self.assertEqual("table: 0 features, 0 features/sec", format_progress(stats))
+
+
+class GeometryTableInsertTests(TestCase):
+    def setUp(self):
+        conn = sqlite3.connect(":memory:")
+        conn.create_function("ST_GeomFromWKB", 2, lambda wkb, srid: wkb)
+        self.db = Database(conn)
+        self.db["places"].create({"name": str, "geometry": bytes})
+        self.table = GeometryTable(self.db, "places", 4326, "GEOMETRY")
+
+    def insert(self, records):
+        self.table.insert(
+            records,
+            alter=True,
+            conversions={"geometry": "ST_GeomFromWKB(?, 4326)"},
+        )
+
+    def test_insert(self):
+        self.insert([{"name": "a", "geometry": b"1"}, {"geometry": b"2"}])
+        self.assertEqual(
+            [("a", b"1"), (None, b"2")],
+            self.db.execute("SELECT name, geometry FROM places;").fetchall(),
+        )
+
+    def test_new_columns_are_added(self):
+        self.insert([{"name": "a", "geometry": b"1"}])
+        self.insert([{"name": "b", "size": 2, "geometry": b"2"}])
+        self.insert([{"name": "c", "size": 3, "geometry": b"3"}])
+        self.assertEqual(["name", "geometry", "size"], self.table.columns)
+        self.assertEqual(
+            [("a", None), ("b", 2), ("c", 3)],
+            self.db.execute("SELECT name, size FROM places;").fetchall(),
+        )
+
+    def test_reprojection_function_is_registered_once(self):
+        self.db.conn.create_function("ST_Transform", 2, lambda g, srid: g)
+        self.db.conn = mock.Mock(wraps=self.db.conn)
+        table = GeometryTable(self.db, "places", 3857, "GEOMETRY", source_srid=4326)
+        # as FeatureLoader.insert does, for each batch
+        for i in range(3):
+            table.insert(
+                [{"name": str(i), "geometry": b"1"}],
+                alter=True,
+                conversions=table.conversions,
+            )
+        self.db.conn.create_function.assert_called_once()
+        self.assertEqual(3, self.db["places"].count)
+        table.check_reprojections()